@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+
+import os
+import json
+import random
+import struct
+import base64
+import click
+from datetime import datetime, timedelta
+
+'''
+Synthetic photo corpus for benchmarking photobinner.
+
+Writes small but well-formed JPEGs with an EXIF block (Make, Model, DateTime,
+DateTimeOriginal) into the folder shapes photobinner deals with:
+
+    <Event Name>_YYYY_MM_DD/IMG_nnnn.JPG        dated, descriptive folders
+    DCIM/100CANON/IMG_YYYYMMDD_HHMMSS.jpg       filename timestamps
+    phone_backup/IMG_nnnn.JPG                   Apple make, descriptive from EXIF
+    copies/...                                  byte-identical duplicates
+    collisions/...                              same filename, different content
+
+and records what it wrote in corpus.json.
+'''
+
+# -- 1x1 greyscale baseline JPEG, everything after SOI is spliced in after the EXIF block
+PIXEL_JPEG = base64.b64decode(
+    "/9j/4AAQSkZJRgABAQEASABIAAD/2wBDAP//////////////////////////////////////////////////////////////////"
+    "////////////////////wgALCAABAAEBAREA/8QAFBABAAAAAAAAAAAAAAAAAAAAAP/aAAgBAQABPxA="
+)
+
+CAMERAS = [('Canon', 'Canon EOS DIGITAL REBEL'), ('Canon', 'Canon PowerShot S95'), ('NIKON CORPORATION', 'NIKON D90'), ('Apple', 'iPhone 5')]
+EVENTS = ['Beach Trip', 'Birthday Party', 'Hiking', 'Graduation', 'Snow Day', 'Road Trip']
+
+EXIF_ASCII = 2
+EXIF_LONG = 4
+
+def _ifd(entries, offset):
+    '''
+    Packs (tag, type, value) entries into a little-endian IFD starting at offset, with
+    values that don't fit the entry stored right after it. Returns the IFD bytes.
+    '''
+    data_offset = offset + 2 + 12*len(entries) + 4
+    table = struct.pack('<H', len(entries))
+    data = b''
+    for (tag, field_type, value,) in sorted(entries):
+        if field_type == EXIF_ASCII:
+            raw = value.encode('ascii') + b'\x00'
+            if len(raw) <= 4:
+                table += struct.pack('<HHI', tag, field_type, len(raw)) + raw.ljust(4, b'\x00')
+            else:
+                table += struct.pack('<HHII', tag, field_type, len(raw), data_offset + len(data))
+                data += raw + (b'\x00' if len(raw) % 2 else b'')
+        else:
+            table += struct.pack('<HHII', tag, field_type, 1, value)
+    return table + struct.pack('<I', 0) + data
+
+def exif_block(make, model, timestamp):
+    '''
+    APP1 segment carrying IFD0 (Make, Model, DateTime) and an EXIF IFD (DateTimeOriginal)
+    '''
+    stamp = datetime.strftime(timestamp, "%Y:%m:%d %H:%M:%S")
+    ifd0_entries = [(0x010F, EXIF_ASCII, make), (0x0110, EXIF_ASCII, model), (0x0132, EXIF_ASCII, stamp)]
+    # -- size IFD0 with a placeholder ExifOffset, then place the EXIF IFD after it
+    ifd0_size = len(_ifd(ifd0_entries + [(0x8769, EXIF_LONG, 0)], 8))
+    exif_offset = 8 + ifd0_size
+    tiff = b'II*\x00' + struct.pack('<I', 8)
+    tiff += _ifd(ifd0_entries + [(0x8769, EXIF_LONG, exif_offset)], 8)
+    tiff += _ifd([(0x9003, EXIF_ASCII, stamp)], exif_offset)
+    payload = b'Exif\x00\x00' + tiff
+    return b'\xff\xe1' + struct.pack('>H', len(payload) + 2) + payload
+
+def padding_segments(size, generator):
+    '''
+    COM segments filling size bytes of generator's random bytes, standing in for image data
+    '''
+    segments = b''
+    while size > 4:
+        chunk = min(size - 4, 65533)
+        segments += b'\xff\xfe' + struct.pack('>H', chunk + 2) + generator.getrandbits(8*chunk).to_bytes(chunk, 'little')
+        size -= chunk + 4
+    return segments
+
+def jpeg(make, model, timestamp, size, generator):
+    head = b'\xff\xd8' + exif_block(make, model, timestamp)
+    body = PIXEL_JPEG[2:]
+    return head + padding_segments(size - len(head) - len(body), generator) + body
+
+def _write(path, content, timestamp):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(content)
+    mtime = (timestamp - datetime(1970, 1, 1)).total_seconds()
+    os.utime(path, (mtime, mtime))
+
+def generate(folder, count, size_kb, duplicate_ratio=0.05, seed=0):
+    '''
+    Writes count originals (plus duplicates and collisions) under folder, returns the manifest
+    '''
+    # -- every random choice and byte comes from here, so the seed alone decides the corpus
+    generator = random.Random(seed)
+    start = datetime(2015, 1, 1)
+    files = []
+    for n in range(count):
+        timestamp = start + timedelta(seconds=generator.randint(0, 5*365*24*3600))
+        (make, model,) = generator.choice(CAMERAS)
+        shape = n % 3
+        if make == 'Apple':
+            path = os.path.join(folder, 'phone_backup', "IMG_%04d.JPG" % n)
+        elif shape == 0:
+            event = generator.choice(EVENTS)
+            path = os.path.join(folder, "%s_%s" % (event, datetime.strftime(timestamp, "%Y_%m_%d")), "IMG_%04d.JPG" % n)
+        elif shape == 1:
+            path = os.path.join(folder, 'DCIM', '100CANON', "IMG_%s.jpg" % datetime.strftime(timestamp, "%Y%m%d_%H%M%S"))
+        else:
+            path = os.path.join(folder, 'misc', "%s" % datetime.strftime(timestamp, "%Y"), "DSC_%04d.JPG" % n)
+        content = jpeg(make, model, timestamp, size_kb*1024, generator)
+        _write(path, content, timestamp)
+        files.append({ 'path': path, 'kind': 'original', 'timestamp': datetime.strftime(timestamp, "%Y-%m-%d %H:%M:%S"), 'make': make, 'size': len(content) })
+        if generator.random() < duplicate_ratio:
+            copy_path = os.path.join(folder, 'copies', "%s" % n, os.path.basename(path))
+            _write(copy_path, content, timestamp)
+            files.append({ 'path': copy_path, 'kind': 'duplicate', 'of': path, 'size': len(content) })
+        if generator.random() < duplicate_ratio:
+            collision_path = os.path.join(folder, 'collisions', "%s" % n, os.path.basename(path))
+            collision = jpeg(make, model, timestamp, size_kb*1024, generator)
+            _write(collision_path, collision, timestamp)
+            files.append({ 'path': collision_path, 'kind': 'collision', 'of': path, 'size': len(collision) })
+    manifest = { 'count': count, 'size_kb': size_kb, 'seed': seed, 'files': files }
+    with open(os.path.join(folder, 'corpus.json'), 'w') as f:
+        json.dump(manifest, f, indent=4)
+    return manifest
+
+def load(folder):
+    with open(os.path.join(folder, 'corpus.json'), 'r') as f:
+        return json.load(f)
+
+@click.command()
+@click.option('--count', '-n', 'count', default=1000, help='Number of original images')
+@click.option('--size-kb', '-s', 'size_kb', default=256, help='Approximate size of each image')
+@click.option('--duplicate-ratio', '-r', 'duplicate_ratio', default=0.05, help='Chance of each image getting a byte-identical copy, and separately a same-name collision')
+@click.option('--seed', 'seed', default=0, help='Random seed, the same seed gives the same corpus')
+@click.argument('folder')
+def main(count, size_kb, duplicate_ratio, seed, folder):
+    manifest = generate(folder, count, size_kb, duplicate_ratio, seed)
+    print("%s files written to %s" % (len(manifest['files']), folder))
+
+if __name__ == "__main__":
+    main()
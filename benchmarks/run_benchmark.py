@@ -0,0 +1,193 @@
+#!/usr/bin/env python
+
+import os
+import sys
+import json
+import time
+import types
+import shutil
+import logging
+import platform
+import tempfile
+import subprocess
+import click
+from datetime import datetime
+from importlib.machinery import SourceFileLoader
+
+import corpus
+
+'''
+Runs photobinner against a synthetic corpus (see corpus.py) and reports files/sec,
+bytes/sec and time spent in each phase, saving the results as JSON for comparison
+between runs.
+
+Each mode runs in its own process with its own HOME, so photobinner reads a
+generated ~/.pbrc/config and starts from empty stats (session files, hash index):
+
+    dry     --dry-run against an empty target
+    real    copies into an empty target
+    repeat  real, then real again into the populated target (the second run is timed)
+
+Phase timings are photobinner's own (run_stats['meta']['runs'][n]['phases']) and nest:
+'file' covers everything done per file, 'hash' is also counted in 'move_action'.
+'''
+
+BENCHMARK_FOLDER = os.path.dirname(os.path.abspath(__file__))
+PHOTOBINNER_FOLDER = os.path.join(os.path.dirname(BENCHMARK_FOLDER), 'photobinner')
+MODES = ['dry', 'real', 'repeat']
+SOURCE_NAME = "Bench"
+
+PBRC = '''[DEFAULT]
+target = %(target)s
+
+[folders]
+exact_matches = %(exact_matches)s
+copy_exact_matches = False
+
+[locale]
+timezone = US/Eastern
+
+[Source-%(source)s]
+type = Folder
+mountpoint = %(corpus)s
+transfer_method = copy
+'''
+
+def _write_pbrc(home, corpus_folder, target):
+    pbrc = os.path.join(home, '.pbrc')
+    os.makedirs(pbrc, exist_ok=True)
+    with open(os.path.join(pbrc, 'config'), 'w') as f:
+        f.write(PBRC % { 'target': target, 'exact_matches': os.path.join(home, 'exact_matches'), 'source': SOURCE_NAME, 'corpus': corpus_folder })
+
+def _load_photobinner():
+    '''
+    The photobinner script has no .py extension and reads ~/.pbrc on import
+    '''
+    sys.path.insert(0, PHOTOBINNER_FOLDER)
+    loader = SourceFileLoader('photobinner_script', os.path.join(PHOTOBINNER_FOLDER, 'photobinner'))
+    module = types.ModuleType(loader.name)
+    loader.exec_module(module)
+    return module
+
+def _corpus_bytes(corpus_folder):
+    return sum([ f['size'] for f in corpus.load(corpus_folder)['files'] ])
+
+def run_once(dry_run, workers, session_name):
+    '''
+    One PhotoBinner run in this process, against whatever ~/.pbrc points at
+    '''
+    pb_module = _load_photobinner()
+    start = time.perf_counter()
+    pb = pb_module.PhotoBinner(
+        dry_run=dry_run,
+        target_base_folder=pb_module.DEFAULT_TARGET,
+        exact_matches_folder=pb_module.EXACT_MATCHES_FOLDER,
+        workers=workers,
+        session_choice='n',
+        session_name=session_name
+    )
+    setup_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    pb.run()
+    run_seconds = time.perf_counter() - start
+    return {
+        'setup_seconds': setup_seconds,
+        'run_seconds': run_seconds,
+        'files': sum([ r['file_count'] for r in pb.run_stats['meta']['runs'] ]),
+        'phases': pb.run_stats['meta']['runs'][-1]['phases']
+    }
+
+def _run_child(home, dry_run, workers, session_name, verbose):
+    '''
+    run_once in a fresh process, so module-level config and class state don't carry over
+    '''
+    result_file = os.path.join(home, 'result.json')
+    command = [sys.executable, os.path.abspath(__file__), '--child', '--workers', str(workers), '--result', result_file, '--session-name', session_name]
+    if dry_run:
+        command.append('--dry-run')
+    env = dict(os.environ, HOME=home)
+    output = None if verbose else subprocess.DEVNULL
+    subprocess.run(command, env=env, stdout=output, stderr=output, check=True)
+    with open(result_file, 'r') as f:
+        return json.load(f)
+
+def benchmark_mode(mode, corpus_folder, workers, verbose):
+    home = tempfile.mkdtemp(prefix="pb_bench_%s_" % mode)
+    try:
+        target = os.path.join(home, 'target')
+        os.makedirs(target)
+        _write_pbrc(home, corpus_folder, target)
+        if mode == 'repeat':
+            _run_child(home, False, workers, 'warmup', verbose)
+        result = _run_child(home, mode == 'dry', workers, mode, verbose)
+    finally:
+        shutil.rmtree(home)
+    total_bytes = _corpus_bytes(corpus_folder)
+    seconds = result['run_seconds']
+    result['bytes'] = total_bytes
+    result['files_per_second'] = result['files']/seconds if seconds > 0 else None
+    result['bytes_per_second'] = total_bytes/seconds if seconds > 0 else None
+    return result
+
+def report(results):
+    for mode in results['modes']:
+        r = results['modes'][mode]
+        print("%s: %s files in %.2fs (setup %.2fs) - %.1f files/s, %.2f MB/s" % (mode, r['files'], r['run_seconds'], r['setup_seconds'], r['files_per_second'] or 0, (r['bytes_per_second'] or 0)/(1024*1024)))
+        phases = [ p for p in r['phases'] if not p.startswith('_') ]
+        for phase in sorted(phases, key=lambda p: -r['phases'][p]['seconds']):
+            timings = r['phases'][phase]
+            print("    %-12s %8s calls %9.3fs  p50 %7.2fms  p90 %7.2fms  p99 %7.2fms" % (phase, timings['calls'], timings['seconds'], timings['p50_ms'], timings['p90_ms'], timings['p99_ms']))
+
+@click.command()
+@click.option('--corpus', '-c', 'corpus_folder', default=None, help='Existing corpus folder, default generates one in a temp folder')
+@click.option('--count', '-n', 'count', default=500, help='Number of original images when generating the corpus')
+@click.option('--size-kb', '-s', 'size_kb', default=256, help='Approximate image size when generating the corpus')
+@click.option('--seed', 'seed', default=0, help='Corpus random seed')
+@click.option('--mode', '-m', 'modes', multiple=True, type=click.Choice(MODES), help='Modes to run, default dry and real')
+@click.option('--workers', '-w', 'workers', default=1, help='Passed to photobinner --workers')
+@click.option('--output', '-o', 'output', default=None, help='Write the results here as JSON')
+@click.option('--verbose', '-v', 'verbose', is_flag=True, help="Show photobinner's own output")
+@click.option('--child', 'child', is_flag=True, hidden=True)
+@click.option('--dry-run', 'dry_run', is_flag=True, hidden=True)
+@click.option('--session-name', 'session_name', default='benchmark', hidden=True)
+@click.option('--result', 'result_file', default=None, hidden=True)
+def main(corpus_folder, count, size_kb, seed, modes, workers, output, verbose, child, dry_run, session_name, result_file):
+
+    if child:
+        logging.basicConfig(level=logging.INFO if verbose else logging.WARNING)
+        result = run_once(dry_run, workers, session_name)
+        with open(result_file, 'w') as f:
+            json.dump(result, f)
+        return
+
+    generated = None
+    if not corpus_folder:
+        generated = corpus_folder = tempfile.mkdtemp(prefix="pb_corpus_")
+        print("Generating %s images in %s.." % (count, corpus_folder))
+        corpus.generate(corpus_folder, count, size_kb, seed=seed)
+    manifest = corpus.load(corpus_folder)
+
+    results = {
+        'started': datetime.strftime(datetime.now(), "%Y-%m-%dT%H:%M:%S"),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'workers': workers,
+        'corpus': { 'count': manifest['count'], 'size_kb': manifest['size_kb'], 'seed': manifest['seed'], 'files': len(manifest['files']) },
+        'modes': {}
+    }
+    try:
+        for mode in modes or ['dry', 'real']:
+            print("Running %s.." % mode)
+            results['modes'][mode] = benchmark_mode(mode, corpus_folder, workers, verbose)
+    finally:
+        if generated:
+            shutil.rmtree(generated)
+
+    report(results)
+    if output:
+        with open(output, 'w') as f:
+            json.dump(results, f, indent=4, sort_keys=True)
+        print("Results written to %s" % output)
+
+if __name__ == "__main__":
+    main()
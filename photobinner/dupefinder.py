@@ -0,0 +1,160 @@
+#!/usr/bin/python
+
+import os
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+'''
+Finds byte-identical files across folder trees in stages, each reading less than the
+next and only for files still in the running:
+
+    1) size         from the walk, no reads
+    2) partial      digest of the first and last PARTIAL_SIZE bytes
+    3) full         digest of the whole file, large sequential reads
+
+Files no bigger than both partial reads together are settled at stage 2.
+'''
+
+PARTIAL_SIZE = 16*1024
+READ_SIZE = 4*1024*1024
+# -- fast in hashlib on 64-bit, and no weaker than md5 for telling files apart
+DEFAULT_DIGEST = 'blake2b'
+
+class DupeFinder(object):
+    '''
+    Groups of duplicate files, each group in scan order: folders in the order given,
+    each walked in sorted order, so the first path of a group is the one to keep
+    '''
+
+    digest = DEFAULT_DIGEST
+    workers = 1
+    # -- wanted(filename) -> bool, None for every file
+    wanted = None
+    # -- folders not to walk, e.g. where duplicates are moved to
+    exclude = None
+    min_size = 1
+
+    def __init__(self, *args, **kwargs):
+        for k in kwargs:
+            self.__setattr__(k, kwargs[k])
+        hashlib.new(self.digest)
+        self.exclude = set([ os.path.abspath(e) for e in self.exclude or [] ])
+        self.stats = { 'files': 0, 'bytes': 0, 'partial_hashed': 0, 'full_hashed': 0, 'hardlinks': 0, 'unreadable': 0 }
+        # -- path -> size of every file with a same-size match, from the last find()
+        self.sizes = {}
+
+    def _walk(self, folder):
+        '''
+        Yields (path, stat) of each regular file under folder, sorted within each folder
+        '''
+        stack = [os.path.abspath(folder)]
+        while stack:
+            current = stack.pop()
+            if current in self.exclude:
+                continue
+            try:
+                entries = sorted(os.scandir(current), key=lambda e: e.name)
+            except OSError as oe:
+                logger.warning(" - can't list %s: %s" % (current, oe.strerror))
+                continue
+            subfolders = []
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    subfolders.append(entry.path)
+                elif entry.is_file(follow_symlinks=False) and (not self.wanted or self.wanted(entry.name)):
+                    try:
+                        stats = entry.stat(follow_symlinks=False)
+                    except OSError as oe:
+                        logger.warning(" - can't stat %s: %s" % (entry.path, oe.strerror))
+                        continue
+                    yield (entry.path, stats,)
+            # -- popped in sorted order
+            stack.extend(reversed(subfolders))
+
+    def _partial_digest(self, path, size):
+        hasher = hashlib.new(self.digest)
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            if size <= 2*PARTIAL_SIZE:
+                hasher.update(os.pread(fd, size, 0))
+            else:
+                hasher.update(os.pread(fd, PARTIAL_SIZE, 0))
+                hasher.update(os.pread(fd, PARTIAL_SIZE, size - PARTIAL_SIZE))
+        finally:
+            os.close(fd)
+        return hasher.hexdigest()
+
+    def _full_digest(self, path):
+        hasher = hashlib.new(self.digest)
+        buffer = bytearray(READ_SIZE)
+        view = memoryview(buffer)
+        with open(path, 'rb', buffering=0) as f:
+            if hasattr(os, 'posix_fadvise'):
+                os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            while True:
+                read = f.readinto(buffer)
+                if not read:
+                    break
+                hasher.update(view[:read])
+        return hasher.hexdigest()
+
+    def _regroup(self, groups, key, executor):
+        '''
+        Splits each group of paths by key(path), keeping only the splits with more than one path.
+        A file that can't be read (gone, no permission) is dropped from its group.
+        '''
+        def safe_key(path):
+            try:
+                return key(path)
+            except OSError as oe:
+                logger.warning(" - can't read %s: %s" % (path, oe.strerror))
+                return None
+        paths = [ p for g in groups for p in g ]
+        keys = dict(zip(paths, executor.map(safe_key, paths))) if executor else { p: safe_key(p) for p in paths }
+        self.stats['unreadable'] += len([ p for p in paths if keys[p] is None ])
+        regrouped = []
+        for group in groups:
+            split = {}
+            for path in [ p for p in group if keys[p] is not None ]:
+                split.setdefault(keys[path], []).append(path)
+            regrouped.extend([ s for s in split.values() if len(s) > 1 ])
+        return regrouped
+
+    def find(self, folders):
+        order = {}
+        by_size = {}
+        inodes = set()
+        for folder in folders:
+            for (path, stats,) in self._walk(folder):
+                if (stats.st_dev, stats.st_ino,) in inodes:
+                    # -- another name for a file already seen, not a copy of it
+                    self.stats['hardlinks'] += 1
+                    continue
+                inodes.add((stats.st_dev, stats.st_ino,))
+                self.stats['files'] += 1
+                self.stats['bytes'] += stats.st_size
+                if stats.st_size < self.min_size:
+                    continue
+                order[path] = len(order)
+                by_size.setdefault(stats.st_size, []).append(path)
+        sizes = self.sizes = { p: s for s in by_size for p in by_size[s] if len(by_size[s]) > 1 }
+        groups = [ by_size[s] for s in by_size if len(by_size[s]) > 1 ]
+        logger.info("%s files, %s with a same-size match" % (self.stats['files'], len(sizes)))
+
+        executor = ThreadPoolExecutor(max_workers=self.workers) if self.workers > 1 else None
+        try:
+            self.stats['partial_hashed'] = sum([ len(g) for g in groups ])
+            groups = self._regroup(groups, lambda p: self._partial_digest(p, sizes[p]), executor)
+            # -- small files were read whole for the partial digest
+            settled = [ g for g in groups if sizes[g[0]] <= 2*PARTIAL_SIZE ]
+            candidates = [ g for g in groups if sizes[g[0]] > 2*PARTIAL_SIZE ]
+            logger.info("%s files still candidates after partial hashing" % sum([ len(g) for g in candidates ]))
+            self.stats['full_hashed'] = sum([ len(g) for g in candidates ])
+            groups = settled + self._regroup(candidates, self._full_digest, executor)
+        finally:
+            if executor:
+                executor.shutdown()
+        return sorted([ sorted(g, key=lambda p: order[p]) for g in groups ], key=lambda g: order[g[0]])
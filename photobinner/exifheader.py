@@ -0,0 +1,147 @@
+#!/usr/bin/python
+
+import os
+import struct
+import logging
+
+logger = logging.getLogger(__name__)
+
+'''
+Minimal EXIF reader for the few tags photobinner files by (see exifwrapper.VALUE_MAP).
+
+One read of the start of the file, then only IFD0 and the EXIF sub-IFD are walked, for
+JPEG (APP1 'Exif') and TIFF-based files (TIFF, CR2). Returns None for anything else, or
+anything that doesn't fit in the read, so the caller can fall back to exifread.
+'''
+
+HEADER_READ_SIZE = 128*1024
+
+JPEG_SOI = b'\xff\xd8'
+TIFF_HEADERS = { b'II*\x00': '<', b'MM\x00*': '>' }
+EXIF_APP1 = 0xE1
+# -- markers with no length/payload
+JPEG_STANDALONE = frozenset([0x01, 0xD0, 0xD1, 0xD2, 0xD3, 0xD4, 0xD5, 0xD6, 0xD7, 0xD8])
+# -- start of scan and end of image: no metadata past these
+JPEG_END = frozenset([0xDA, 0xD9])
+
+TYPE_ASCII = 2
+IFD0_TAGS = { 0x010F: 'Image Make', 0x0110: 'Image Model', 0x0132: 'Image DateTime' }
+EXIF_IFD_TAGS = { 0x9003: 'EXIF DateTimeOriginal' }
+EXIF_OFFSET_TAG = 0x8769
+
+class HeaderTag(object):
+    '''
+    Stands in for exifread's IfdTag: str() is the printable value
+    '''
+
+    def __init__(self, printable, values):
+        self.printable = printable
+        self.values = values
+
+    def __str__(self):
+        return self.printable
+
+    def __repr__(self):
+        return self.printable
+
+class Truncated(Exception):
+    '''
+    The metadata runs past what was read
+    '''
+    pass
+
+def _jpeg_tiff_start(data):
+    '''
+    Offset of the TIFF header in the Exif APP1 segment, -1 if the file has none,
+    None if the segments run past the read or don't parse
+    '''
+    pos = 2
+    while pos + 4 <= len(data):
+        if data[pos] != 0xFF:
+            # -- not where a marker should be, leave it to exifread
+            return None
+        marker = data[pos+1]
+        if marker == 0xFF:
+            # -- fill byte
+            pos += 1
+            continue
+        if marker in JPEG_STANDALONE:
+            pos += 2
+            continue
+        if marker in JPEG_END:
+            return -1
+        (length,) = struct.unpack('>H', data[pos+2:pos+4])
+        if marker == EXIF_APP1 and data[pos+4:pos+10] == b'Exif\x00\x00':
+            return pos + 10
+        pos += 2 + length
+    return None
+
+def _ascii(data, start, count):
+    if start + count > len(data):
+        raise Truncated()
+    value = data[start:start+count].split(b'\x00', 1)[0]
+    try:
+        # -- as exifread does, undecodable values are left as bytes
+        value = value.decode('utf-8')
+    except UnicodeDecodeError:
+        pass
+    return value
+
+def _read_ifd(data, tiff_start, offset, order, wanted, tags):
+    '''
+    Adds the wanted ASCII tags of the IFD at offset to tags, returns the EXIF sub-IFD offset if present
+    '''
+    start = tiff_start + offset
+    if start + 2 > len(data):
+        raise Truncated()
+    (entries,) = struct.unpack(order + 'H', data[start:start+2])
+    if start + 2 + 12*entries > len(data):
+        raise Truncated()
+    exif_offset = None
+    for n in range(entries):
+        entry = start + 2 + 12*n
+        (tag, field_type, count,) = struct.unpack(order + 'HHI', data[entry:entry+8])
+        if tag in wanted and field_type == TYPE_ASCII:
+            if count <= 4:
+                value = _ascii(data, entry + 8, count)
+            else:
+                (value_offset,) = struct.unpack(order + 'I', data[entry+8:entry+12])
+                value = _ascii(data, tiff_start + value_offset, count)
+            tags[wanted[tag]] = HeaderTag(str(value), value)
+        elif tag == EXIF_OFFSET_TAG:
+            (exif_offset,) = struct.unpack(order + 'I', data[entry+8:entry+12])
+    return exif_offset
+
+def read_header_tags(filepath, read_size=HEADER_READ_SIZE):
+    '''
+    Returns the VALUE_MAP tags found (exifread names -> HeaderTag), {} if the file has no
+    EXIF, or None if this reader can't tell
+    '''
+    fd = os.open(filepath, os.O_RDONLY)
+    try:
+        data = os.pread(fd, read_size, 0)
+    finally:
+        os.close(fd)
+    if data[:2] == JPEG_SOI:
+        tiff_start = _jpeg_tiff_start(data)
+        if tiff_start is None:
+            return None
+        if tiff_start < 0:
+            return {}
+    elif data[:4] in TIFF_HEADERS:
+        tiff_start = 0
+    else:
+        return None
+    order = TIFF_HEADERS.get(data[tiff_start:tiff_start+4])
+    if not order:
+        return None
+    tags = {}
+    try:
+        (ifd0_offset,) = struct.unpack(order + 'I', data[tiff_start+4:tiff_start+8])
+        exif_offset = _read_ifd(data, tiff_start, ifd0_offset, order, IFD0_TAGS, tags)
+        if exif_offset:
+            _read_ifd(data, tiff_start, exif_offset, order, EXIF_IFD_TAGS, tags)
+    except (Truncated, struct.error):
+        logger.debug("EXIF header of %s not within the first %s bytes" % (filepath, read_size))
+        return None
+    return tags
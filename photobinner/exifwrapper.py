@@ -10,6 +10,9 @@ import json
 import signal
 from glob import glob
 import os
+import timestamps
+import exifheader
+import videometa
 
 # exifread_logger = logging.getLogger('exifread')
 # exifread_logger.setLevel(logging.WARN)
@@ -18,17 +21,26 @@ UTC = timezone("UTC")
 DEFAULT_TIMEZONE = 'US/Eastern'
 
 VALUE_MAP = {
-    'image_datetime': ['Image DateTime', 'EXIF DateTimeOriginal'],
+    'image_datetime': ['Image DateTime', 'EXIF DateTimeOriginal', videometa.CREATION_TAG],
     'image_make': ['Image Make'],
     'image_model': ['Image Model']
 }
 
+# -- exifread walks IFD0 (make, model, datetime) before the EXIF sub-IFD, so
+# -- stopping on the sub-IFD's DateTimeOriginal covers every VALUE_MAP tag
+VALUE_MAP_STOP_TAG = 'DateTimeOriginal'
+
 class ExifWrapper(object):
 
     timezone = DEFAULT_TIMEZONE
     assume_local = True
     filepath = None
     tz = None
+    # -- when set, only parse as far as the VALUE_MAP tags
+    value_map_only = False
+    # -- per-file metadata record, filled once on first access
+    tags = None
+    values = None
 
     def __init__(self, *args, **kwargs):
         if 'filepath' not in kwargs:
@@ -43,23 +55,44 @@ class ExifWrapper(object):
         if exifread_logger.getEffectiveLevel() == 10:
             exifread_logger.setLevel(20)
 
-    def _get_file_tags(self, filepath, details=False):
+    def _get_file_tags(self, filepath, details=False, stop_tag=None):
         tags = None 
         with open(filepath, 'rb') as f:
-            tags = exifread.process_file(f, details=details)
+            if stop_tag:
+                tags = exifread.process_file(f, details=details, stop_tag=stop_tag)
+            else:
+                tags = exifread.process_file(f, details=details)
         return tags
 
+    def _load_tags(self):
+        '''
+        Reads the file's tags once and keeps them for every later lookup.
+        '''
+        if self.tags is None:
+            if self.value_map_only:
+                # -- header reads for videos and JPEG/TIFF/CR2, exifread for anything else
+                self.tags = videometa.read_video_tags(self.filepath)
+                if self.tags is None:
+                    self.tags = exifheader.read_header_tags(self.filepath)
+                if self.tags is None:
+                    self.tags = self._get_file_tags(self.filepath, stop_tag=VALUE_MAP_STOP_TAG) or {}
+            else:
+                self.tags = self._get_file_tags(self.filepath) or {}
+        return self.tags
+
     def _extract_all_metadata(self):
         '''
         Looks for all EXIF keys referenced in each key type in VALUE_MAP and returns a dict of the first value found for each type.
         '''
-        values = {}
-        TAGS = self._get_file_tags(self.filepath)
-        for key in VALUE_MAP:
-            for tag in VALUE_MAP[key]:
-                if tag in TAGS and key not in values:
-                    values[key] = TAGS[tag]
-        return values
+        if self.values is None:
+            values = {}
+            TAGS = self._load_tags()
+            for key in VALUE_MAP:
+                for tag in VALUE_MAP[key]:
+                    if tag in TAGS and key not in values:
+                        values[key] = TAGS[tag]
+            self.values = values
+        return self.values
 
     def _extract_metadata_for_key(self, key=None):
         '''
@@ -67,19 +100,12 @@ class ExifWrapper(object):
         '''
         if not key:
             return self._extract_all_metadata()
-        value = None
-        TAGS = self._get_file_tags(self.filepath)
-        for tag in VALUE_MAP[key]:
-            if tag in TAGS and not value:
-                value = TAGS[tag]
-                if value:
-                    break
-        return value
+        return self._extract_all_metadata().get(key)
 
     def _fix_timezone(self, image_datetime):
         if self.assume_local:
             # - call it what it is
-            return self.tz.localize(image_datetime)
+            return timestamps.localize(self.tz, image_datetime)
         else:
             # - call it what it is
             utc_image_datetime = UTC.localize(image_datetime)
@@ -89,18 +115,14 @@ class ExifWrapper(object):
     def _get_date_object(self, raw_image_datetime):
         if not raw_image_datetime:
             return None
-        local_image_datetime = None
-        attempt_formats = ["%Y:%m:%d %H:%M:%S", "%Y:%m:%d %H:%M: %S"]
-        for format in attempt_formats:
-            try:
-                # - the timestamp is UTC with no timezone markers
-                image_datetime = datetime.strptime("%s" %(str(raw_image_datetime)), format)
-                local_image_datetime = self._fix_timezone(image_datetime)
-                break
-            except:
-                pass
-
-        return local_image_datetime
+        if isinstance(raw_image_datetime, datetime):
+            # - video creation times arrive parsed, in UTC if the container says so
+            if raw_image_datetime.tzinfo:
+                return raw_image_datetime.astimezone(self.tz)
+            return self._fix_timezone(raw_image_datetime)
+        # - the timestamp is UTC with no timezone markers
+        image_datetime = timestamps.parse_exif(raw_image_datetime)
+        return self._fix_timezone(image_datetime) if image_datetime else None
 
     def image_datetime(self):
         '''
@@ -113,7 +135,7 @@ class ExifWrapper(object):
         '''
         Returns dict of first-found of each configured EXIF key type
         '''
-        all_values = self._extract_all_metadata()
+        all_values = dict(self._extract_all_metadata())
         if 'image_datetime' in all_values:
             all_values['image_datetime'] = self._get_date_object(all_values['image_datetime'])
         return all_values
@@ -0,0 +1,138 @@
+#!/usr/bin/python
+
+import os
+import sqlite3
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+HASH_INDEX_FILENAME = "hashindex.db"
+# -- number of writes held in a transaction before committing
+COMMIT_INTERVAL = 500
+PHASH_MASK = (1 << 64) - 1
+
+class HashIndex(object):
+    '''
+    On-disk index of path -> (size, mtime, inode, digest, perceptual hash) for files at
+    the target. A stored digest or perceptual hash is trusted as long as size, mtime and
+    inode still match the file, so repeat comparisons are lookups instead of full re-reads.
+    Safe to share between threads, files are hashed outside the lock.
+    '''
+
+    dbpath = None
+    hash_method = None
+
+    def __init__(self, *args, **kwargs):
+        if 'dbpath' not in kwargs or 'hash_method' not in kwargs:
+            raise ValueError("HashIndex requires a 'dbpath' and a 'hash_method'")
+        for k in kwargs:
+            self.__setattr__(k, kwargs[k])
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(self.dbpath, check_same_thread=False)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, inode INTEGER, digest TEXT)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS files_digest ON files (digest)")
+        if 'phash' not in [ c[1] for c in self.conn.execute("PRAGMA table_info(files)") ]:
+            self.conn.execute("ALTER TABLE files ADD COLUMN phash INTEGER")
+        self.pending = 0
+
+    def _write(self, statement, values):
+        with self.lock:
+            self.conn.execute(statement, values)
+            self.pending += 1
+            if self.pending >= COMMIT_INTERVAL:
+                self.commit()
+
+    def _read(self, statement, values=()):
+        with self.lock:
+            return self.conn.execute(statement, values).fetchall()
+
+    def lookup(self, path, file_stats=None):
+        '''
+        Returns the indexed digest for path if the file is unchanged since it was indexed
+        '''
+        if not file_stats:
+            file_stats = os.stat(path)
+        rows = self._read("SELECT size, mtime_ns, inode, digest FROM files WHERE path = ?", (path,))
+        row = rows[0] if rows else None
+        if row and row[0:3] == (file_stats.st_size, file_stats.st_mtime_ns, file_stats.st_ino):
+            return row[3]
+        return None
+
+    def digest(self, path):
+        '''
+        Returns the digest for path, hashing (and indexing) it only when the index is stale
+        '''
+        file_stats = os.stat(path)
+        digest = self.lookup(path, file_stats)
+        if not digest:
+            logger.debug(" - hashing %s (%s bytes)" % (path, file_stats.st_size))
+            digest = self.hash_method(path)
+            self.record(path, digest=digest, file_stats=file_stats)
+        return digest
+
+    def record(self, path, digest=None, file_stats=None):
+        '''
+        Indexes a file as written, with its digest if already known, otherwise computed on first lookup
+        '''
+        self._upsert(path, 'digest', digest, file_stats)
+
+    def _upsert(self, path, column, value, file_stats=None):
+        '''
+        Sets column (digest or phash) for path, keeping the other one only if the file is unchanged
+        '''
+        if not file_stats:
+            file_stats = os.stat(path)
+        other = 'phash' if column == 'digest' else 'digest'
+        self._write(
+            "INSERT INTO files (path, size, mtime_ns, inode, %(column)s) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(path) DO UPDATE SET "
+            "%(other)s = CASE WHEN size = excluded.size AND mtime_ns = excluded.mtime_ns AND inode = excluded.inode THEN %(other)s END, "
+            "size = excluded.size, mtime_ns = excluded.mtime_ns, inode = excluded.inode, %(column)s = excluded.%(column)s" % { 'column': column, 'other': other },
+            (path, file_stats.st_size, file_stats.st_mtime_ns, file_stats.st_ino, value))
+
+    def perceptual(self, path, file_stats=None):
+        '''
+        Returns the indexed perceptual hash for path if the file is unchanged since it was indexed
+        '''
+        if not file_stats:
+            file_stats = os.stat(path)
+        rows = self._read("SELECT size, mtime_ns, inode, phash FROM files WHERE path = ?", (path,))
+        row = rows[0] if rows else None
+        if row and row[0:3] == (file_stats.st_size, file_stats.st_mtime_ns, file_stats.st_ino) and row[3] is not None:
+            # -- stored signed, sqlite integers are 64-bit signed
+            return row[3] & PHASH_MASK
+        return None
+
+    def record_perceptual(self, path, phash, file_stats=None):
+        self._upsert(path, 'phash', phash - (1 << 64) if phash >= (1 << 63) else phash, file_stats)
+
+    def perceptual_hashes(self):
+        '''
+        Yields (path, perceptual hash) of every indexed file that has one, unchecked against the files
+        '''
+        for (path, phash,) in self._read("SELECT path, phash FROM files WHERE phash IS NOT NULL"):
+            yield (path, phash & PHASH_MASK,)
+
+    def forget(self, path):
+        self._write("DELETE FROM files WHERE path = ?", (path,))
+
+    def paths_for_digest(self, digest, size=None):
+        '''
+        Returns indexed paths holding content with this digest (and size, if given) that still exist unchanged
+        '''
+        if size is None:
+            rows = self._read("SELECT path FROM files WHERE digest = ?", (digest,))
+        else:
+            rows = self._read("SELECT path FROM files WHERE digest = ? AND size = ?", (digest, size))
+        return [ r[0] for r in rows if os.path.exists(r[0]) and self.lookup(r[0]) == digest ]
+
+    def commit(self):
+        with self.lock:
+            self.conn.commit()
+            self.pending = 0
+
+    def close(self):
+        with self.lock:
+            self.commit()
+            self.conn.close()
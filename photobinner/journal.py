@@ -0,0 +1,80 @@
+#!/usr/bin/python
+
+import os
+import json
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_SUFFIX = ".journal"
+
+class SessionJournal(object):
+    '''
+    Append-only JSON-lines companion to a session file. Each record is written and
+    flushed as it happens, so a killed run loses at most the line being written.
+    Detail records may skip the flush, they go out with the next flushed record.
+    Records appended from several threads are written whole, one line each.
+    '''
+
+    path = None
+
+    def __init__(self, *args, **kwargs):
+        if 'path' not in kwargs:
+            raise ValueError("SessionJournal requires a 'path'")
+        for k in kwargs:
+            self.__setattr__(k, kwargs[k])
+        self.handle = None
+        self.lock = threading.Lock()
+
+    def append(self, kind, flush=True, **fields):
+        fields['kind'] = kind
+        line = "%s\n" % json.dumps(fields)
+        with self.lock:
+            if not self.handle:
+                self.handle = open(self.path, 'a')
+            self.handle.write(line)
+            if flush:
+                self.handle.flush()
+
+    def replay(self):
+        '''
+        Yields each record written so far, oldest first
+        '''
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r') as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # -- a run killed mid-write leaves a partial last line
+                    logger.warning(" - skipping unreadable journal line in %s" % self.path)
+
+    def details(self):
+        '''
+        Rebuilds the per-file views the session file only keeps counts of: date_sources and
+        anomalies (key -> paths), moves (folder -> target folder -> paths), correct
+        (folder -> paths), transfers (target path -> transfer result) and near_duplicates
+        (path -> matches)
+        '''
+        details = { 'date_sources': {}, 'anomalies': {}, 'moves': {}, 'correct': {}, 'transfers': {}, 'near_duplicates': {} }
+        for record in self.replay():
+            kind = record.pop('kind')
+            if kind == 'stat':
+                details.setdefault(record['type'], {}).setdefault(record['key'], []).append(record['path'])
+            elif kind == 'moves':
+                details['moves'].setdefault(record['folder'], {}).setdefault(record['target'], []).append(record['path'])
+            elif kind == 'correct':
+                details['correct'].setdefault(record['folder'], []).append(record['path'])
+            elif kind == 'transfer':
+                details['transfers'][record.pop('dest')] = record
+            elif kind == 'near-duplicate':
+                details['near_duplicates'][record['path']] = record['matches']
+        return details
+
+    def close(self):
+        with self.lock:
+            if self.handle:
+                self.handle.close()
+                self.handle = None
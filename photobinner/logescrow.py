@@ -1,6 +1,13 @@
 #!/usr/bin/python
 
+import heapq
 import logging
+import itertools
+from collections import OrderedDict
+
+# -- most statements held for any one event, the oldest are dropped beyond this
+ESCROW_LIMIT = 200
+LONGEST_LEVEL_NAME = 'warning'
 
 class LogEscrow(logging.Logger):
 
@@ -9,51 +16,97 @@ class LogEscrow(logging.Logger):
     # - 1) (if event) stores statement in escrow with the event, which when triggered logs the statement
     # - 2) logs the statement immediately, normally
     # - 3) (if trigger) finds escrowed statements with a matching event, logs those, and then logs the statement
+    # -
+    # - statements are only formatted when logged: either statement % args, or statement() if
+    # - it's callable, for anything costly to build. a statement at a level the logger won't
+    # - emit is dropped at the call, it could never be logged by a release either.
 
 
     def __init__(self, *args, **kwargs):
         self.logger = logging.getLogger(kwargs['name'])
-        self.log_escrow = {}
+        self.sequence = itertools.count()
+        self.clear_log_escrow()
 
-    def _log_align(self, level, statement):
-        longest_log_level_name = 'warning'
-        self.logger.log(level, "%*s%s" % (len(longest_log_level_name)-len(logging.getLevelName(level)), "", statement))
+    def _log_align(self, level, statement, args=()):
+        if callable(statement):
+            statement = statement()
+        elif args:
+            statement = statement % args
+        self.logger.log(level, "%*s%s" % (len(LONGEST_LEVEL_NAME)-len(logging.getLevelName(level)), "", statement))
         #self.logger.log(level, "{:>26}".format(statement))
 
+    def _emit(self, records):
+        for record in records:
+            self.held -= 1
+            self._log_align(record['level'], record['statement'], record['args'])
+
+    def _unindex(self, index, key, record):
+        '''
+        Drops record from the other index it's held in, once taken out of one
+        '''
+        records = index[key]
+        del records[record['sequence']]
+        if not records:
+            del index[key]
+
     def clear_log_escrow(self):
+        # -- the same records, by sequence, indexed by event (for triggers) and by level (for level
+        # -- releases), each taken out of both once released or dropped
         self.log_escrow = {}
+        self.level_escrow = {}
+        self.held = 0
+
+    def _release_levels(self, levels):
+        # -- in the order they were logged, across levels
+        for record in heapq.merge(*[ self.level_escrow.pop(l).values() for l in levels ], key=lambda r: r['sequence']):
+            self._unindex(self.log_escrow, record['event'], record)
+            yield record
+
+    def _release_event(self, event):
+        for record in self.log_escrow.pop(event).values():
+            self._unindex(self.level_escrow, record['level'], record)
+            yield record
 
     def release_log_escrow(self, level=logging.NOTSET, trigger=None):
+        if not self.held:
+            return
         if level > logging.NOTSET:
-            level_holds = [ s for e in self.log_escrow for s in self.log_escrow[e] if s['level'] <= level ]
-            for s in level_holds:
-                self._log_align(s['level'], s['statement'])
-            self.log_escrow = { e: [ s for s in self.log_escrow[e] if s['level'] > level ] for e in self.log_escrow }
+            levels = [ l for l in self.level_escrow if l <= level ]
+            if levels:
+                self._emit(self._release_levels(levels))
         if trigger and trigger in self.log_escrow:
-            for s in self.log_escrow[trigger]:
-                self._log_align(s['level'], s['statement'])
-            del self.log_escrow[trigger]
+            self._emit(self._release_event(trigger))
 
-    def debug(self, statement=None, event=None):
-        self._log_escrow(level=logging.DEBUG, statement=statement, event=event)
+    def debug(self, statement=None, *args, event=None):
+        self._log_escrow(logging.DEBUG, statement, args, event)
 
-    def info(self, statement=None, event=None):
-        self._log_escrow(level=logging.INFO, statement=statement, event=event)
+    def info(self, statement=None, *args, event=None):
+        self._log_escrow(logging.INFO, statement, args, event)
 
-    def warn(self, statement=None, event=None):
-        self._log_escrow(level=logging.WARN, statement=statement, event=event)
+    def warn(self, statement=None, *args, event=None):
+        self._log_escrow(logging.WARN, statement, args, event)
 
-    def error(self, statement=None, event=None):
-        self._log_escrow(level=logging.ERROR, statement=statement, event=event)
+    def error(self, statement=None, *args, event=None):
+        self._log_escrow(logging.ERROR, statement, args, event)
 
-    def fatal(self, statement=None, event=None):
-        self._log_escrow(level=logging.FATAL, statement=statement, event=event)
+    def fatal(self, statement=None, *args, event=None):
+        self._log_escrow(logging.FATAL, statement, args, event)
 
-    def _log_escrow(self, level=logging.INFO, statement=None, event=None):
+    def _log_escrow(self, level, statement, args, event):
+        if not self.logger.isEnabledFor(level):
+            # -- everything held is at an enabled level, so above this one: nothing to release either
+            return
         if event:
-            if event not in self.log_escrow:
-                self.log_escrow[event] = []
-            self.log_escrow[event].append({'level': level, 'statement': statement})
+            record = { 'level': level, 'statement': statement, 'args': args, 'event': event, 'sequence': next(self.sequence) }
+            held = self.log_escrow.setdefault(event, OrderedDict())
+            if len(held) == ESCROW_LIMIT:
+                # -- the oldest is dropped, from its level too
+                (sequence, dropped,) = held.popitem(last=False)
+                self._unindex(self.level_escrow, dropped['level'], dropped)
+                self.held -= 1
+            held[record['sequence']] = record
+            self.level_escrow.setdefault(level, OrderedDict())[record['sequence']] = record
+            self.held += 1
         else:
             self.release_log_escrow(level=level)
-            self._log_align(level, statement)
+            self._log_align(level, statement, args)
@@ -0,0 +1,99 @@
+#!/usr/bin/python
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# -- optional: without them there are no perceptual hashes and the near-duplicate pass is off
+try:
+    import numpy
+    from PIL import Image
+except ImportError:
+    numpy = None
+    Image = None
+
+'''
+Perceptual hashes (dHash) for spotting the same picture in byte-different files: bursts,
+re-encoded exports, embedded previews. Each image is decoded small and grayscale, and
+each bit of its 64-bit hash says whether a pixel is brighter than its right neighbour,
+so near-duplicates differ in only a few bits. Hashes are searched by Hamming distance
+with a multi-index hash table, comparing only a small share of them.
+'''
+
+HASH_SIZE = 8
+# -- JPEGs are decoded straight to no less than this (DCT scaling), instead of full size
+DRAFT_SIZE = 64
+# -- thumbnails hashed per numpy batch
+BATCH_SIZE = 256
+# -- what PIL can decode
+EXTENSIONS = frozenset(["jpg", "jpeg", "gif", "png", "bmp", "tif", "tiff"])
+
+def available():
+    return numpy is not None and Image is not None
+
+def thumbnail(path):
+    '''
+    The (HASH_SIZE, HASH_SIZE + 1) grayscale pixels a dHash is taken from, None if path won't decode
+    '''
+    try:
+        with Image.open(path) as image:
+            image.draft('L', (DRAFT_SIZE, DRAFT_SIZE))
+            small = image.convert('L').resize((HASH_SIZE + 1, HASH_SIZE), Image.BILINEAR)
+            return numpy.asarray(small, dtype=numpy.uint8)
+    except Exception as e:
+        logger.debug("can't decode %s for a perceptual hash: %s" % (path, e))
+        return None
+
+def dhash_batch(thumbnails):
+    '''
+    The 64-bit dHash of each thumbnail, as ints, in one pass over the stacked batch
+    '''
+    if not thumbnails:
+        return []
+    pixels = numpy.stack(thumbnails)
+    bits = pixels[:, :, 1:] > pixels[:, :, :-1]
+    packed = numpy.packbits(bits.reshape(len(thumbnails), HASH_SIZE*HASH_SIZE), axis=1)
+    return [ int(h) for h in packed.view('>u8').ravel() ]
+
+def distance(a, b):
+    return bin(a ^ b).count('1')
+
+class MultiIndex(object):
+    '''
+    Hashes split into radius // 2 + 1 chunks, each chunk a table of value -> items. Two
+    hashes within radius bits of each other are within 1 bit in at least one chunk, so
+    a search only compares the items found at its chunk values and their 1-bit flips.
+    '''
+
+    def __init__(self, radius):
+        self.radius = radius
+        bits = HASH_SIZE*HASH_SIZE
+        chunks = radius//2 + 1
+        # -- the most bits any one chunk can differ by when the whole hash is within radius: 0 or 1
+        self.chunk_radius = radius//chunks
+        # -- (shift, width) of each chunk
+        self.chunks = [ (bits*n//chunks, bits*(n + 1)//chunks - bits*n//chunks,) for n in range(chunks) ]
+        self.tables = [ {} for c in self.chunks ]
+        # -- item -> hash, so an item added again with the same hash isn't found twice
+        self.items = {}
+
+    def add(self, h, item):
+        if self.items.get(item) == h:
+            return
+        self.items[item] = h
+        for ((shift, width,), table,) in zip(self.chunks, self.tables):
+            table.setdefault((h >> shift) & ((1 << width) - 1), []).append(item)
+
+    def search(self, h):
+        '''
+        [(distance, item)] for every item within radius of h, closest first
+        '''
+        candidates = set()
+        for ((shift, width,), table,) in zip(self.chunks, self.tables):
+            value = (h >> shift) & ((1 << width) - 1)
+            candidates.update(table.get(value, ()))
+            if self.chunk_radius:
+                for b in range(width):
+                    candidates.update(table.get(value ^ (1 << b), ()))
+        found = [ (distance(h, self.items[item]), item,) for item in candidates ]
+        return sorted([ f for f in found if f[0] <= self.radius ], key=lambda f: f[0])
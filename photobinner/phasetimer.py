@@ -0,0 +1,127 @@
+#!/usr/bin/python
+
+import math
+import time
+import threading
+from array import array
+from contextlib import contextmanager
+
+PERCENTILES = [50, 90, 99]
+# -- latencies are counted in log-spaced buckets, BUCKETS_PER_DOUBLING for each doubling from
+# -- MIN_SECONDS, so a phase takes the same memory however many calls it sees and a percentile
+# -- is read within ~4% of the true value
+MIN_SECONDS = 1e-6
+BUCKETS_PER_DOUBLING = 8
+# -- up to ~2 days
+BUCKET_COUNT = 300
+
+def _bucket(seconds):
+    '''
+    Bucket 0 holds anything up to MIN_SECONDS, bucket b > 0 holds [MIN_SECONDS*2**((b-1)/8), MIN_SECONDS*2**(b/8))
+    '''
+    if seconds <= MIN_SECONDS:
+        return 0
+    return min(BUCKET_COUNT - 1, int(math.log2(seconds/MIN_SECONDS)*BUCKETS_PER_DOUBLING) + 1)
+
+def _bucket_seconds(bucket):
+    '''
+    The (geometric) middle of a bucket
+    '''
+    if bucket == 0:
+        return MIN_SECONDS
+    return MIN_SECONDS*2**((bucket - 0.5)/BUCKETS_PER_DOUBLING)
+
+class PhaseTimer(object):
+    '''
+    Call counts, cumulative time, latency percentiles and bytes per named phase of the
+    processing loop. Phases may nest (a phase's time includes any recorded inside it).
+    Safe to record into from the pull and worker threads.
+    '''
+
+    def __init__(self, *args, **kwargs):
+        # -- phase -> {'calls', 'seconds', 'min', 'max', 'bytes', 'buckets': calls per latency bucket}
+        self.phases = {}
+        self.lock = threading.Lock()
+        self.start = time.perf_counter()
+        self.last_report = self.start
+
+    def record(self, name, seconds, size=0):
+        with self.lock:
+            if name not in self.phases:
+                self.phases[name] = { 'calls': 0, 'seconds': 0.0, 'min': seconds, 'max': seconds, 'bytes': 0, 'buckets': array('Q', bytes(8*BUCKET_COUNT)) }
+            phase = self.phases[name]
+            phase['calls'] += 1
+            phase['seconds'] += seconds
+            phase['min'] = min(phase['min'], seconds)
+            phase['max'] = max(phase['max'], seconds)
+            phase['bytes'] += size
+            phase['buckets'][_bucket(seconds)] += 1
+
+    @contextmanager
+    def phase(self, name, size=0):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start, size)
+
+    def timed_iter(self, name, items):
+        '''
+        Yields from items, recording the time spent waiting on each one
+        '''
+        iterator = iter(items)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self.record(name, time.perf_counter() - start)
+            yield item
+
+    def due(self, interval):
+        '''
+        True once every interval seconds, for periodic reporting
+        '''
+        now = time.perf_counter()
+        if now - self.last_report < interval:
+            return False
+        self.last_report = now
+        return True
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.start
+        summary = { '_elapsed_seconds': elapsed }
+        with self.lock:
+            phases = { p: dict(self.phases[p], buckets=array('Q', self.phases[p]['buckets'])) for p in self.phases }
+        for (name, phase,) in phases.items():
+            summary[name] = {
+                'calls': phase['calls'],
+                'seconds': phase['seconds'],
+                'percent': 100.0*phase['seconds']/elapsed if elapsed > 0 else None,
+                'mean_ms': 1000.0*phase['seconds']/phase['calls'],
+                'max_ms': 1000.0*phase['max'],
+                'bytes': phase['bytes']
+            }
+            for p in PERCENTILES:
+                summary[name]['p%s_ms' % p] = 1000.0*self._percentile(phase, p)
+        return summary
+
+    def _percentile(self, phase, p):
+        # -- nearest rank, read from the bucket it falls in and kept within the phase's min and max
+        rank = min(phase['calls'] - 1, int(phase['calls']*p/100.0))
+        seen = 0
+        for (bucket, count,) in enumerate(phase['buckets']):
+            seen += count
+            if seen > rank:
+                return min(phase['max'], max(phase['min'], _bucket_seconds(bucket)))
+        return phase['max']
+
+    def line(self):
+        '''
+        One-line rendering of the summary, busiest phases first
+        '''
+        summary = self.summary()
+        phases = sorted([ p for p in summary if not p.startswith('_') ], key=lambda p: -summary[p]['seconds'])
+        return "%.0fs: %s" % (summary['_elapsed_seconds'], ", ".join([ "%s %sx %.1fs p90 %.1fms" % (p, summary[p]['calls'], summary[p]['seconds'], summary[p]['p90_ms']) for p in phases ]))
@@ -0,0 +1,34 @@
+#!/usr/bin/python
+
+from collections import deque
+
+def ordered_prefetch(items, prepare, executor, window, discard=None):
+    '''
+    Yields items in their original order, having run prepare(item) on the executor
+    for up to 'window' items ahead of the consumer. The next item is handed out as soon
+    as it's prepared, waited on only once the window is full or items run out, so a
+    producer that can't get 'window' items ahead (or a short input) isn't waited on.
+    prepare is expected to stash its results on the item; an exception in prepare is
+    left for the consumer to hit again when it does the same work itself. Items never
+    handed to the consumer are passed to discard, if given.
+    '''
+    pending = deque()
+    try:
+        for item in items:
+            pending.append((item, executor.submit(prepare, item)))
+            while pending and (pending[0][1].done() or len(pending) >= window):
+                (ready, future,) = pending.popleft()
+                future.exception()
+                yield ready
+        while pending:
+            (ready, future,) = pending.popleft()
+            future.exception()
+            yield ready
+    finally:
+        # -- consumer stopped early (sigint, smoke test), drop anything not yet started
+        for (item, future,) in pending:
+            # -- a running prepare can't be cancelled, let it finish before discarding its item
+            if not future.cancel():
+                future.exception()
+            if discard:
+                discard(item)
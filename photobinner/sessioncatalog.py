@@ -0,0 +1,70 @@
+#!/usr/bin/python
+
+import os
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+CATALOG_FILENAME = "sessions.json"
+
+class SessionCatalog(object):
+    '''
+    Small index of session files -> session header (status, dry run), kept in the stats
+    folder so listing sessions doesn't mean parsing every session file in full.
+    '''
+
+    folder = None
+
+    def __init__(self, *args, **kwargs):
+        if 'folder' not in kwargs:
+            raise ValueError("SessionCatalog requires a 'folder'")
+        for k in kwargs:
+            self.__setattr__(k, kwargs[k])
+        self.path = os.path.join(self.folder, CATALOG_FILENAME)
+        self.entries = {}
+        self.dirty = False
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r') as f:
+                    self.entries = json.load(f)
+            except ValueError:
+                logger.warning(" - failed to load session catalog %s, rebuilding" % self.path)
+
+    def header(self, sessionfile, loader):
+        '''
+        Returns the cataloged header for sessionfile, falling back to loader(sessionfile)
+        (a full parse) only for sessions not yet cataloged or changed since
+        '''
+        name = os.path.basename(sessionfile)
+        mtime = os.stat(sessionfile).st_mtime
+        entry = self.entries.get(name)
+        if not entry or entry['mtime'] != mtime:
+            logger.debug(" - cataloging %s" % sessionfile)
+            j = loader(sessionfile)
+            if not j or 'meta' not in j:
+                return None
+            self.update(sessionfile, j['meta'], save=False)
+            entry = self.entries[name]
+        return entry
+
+    def update(self, sessionfile, meta, save=True):
+        self.entries[os.path.basename(sessionfile)] = {
+            'status': meta.get('status'),
+            'dry_run': meta.get('dry_run'),
+            'mtime': os.stat(sessionfile).st_mtime
+        }
+        self.dirty = True
+        if save:
+            self.save()
+
+    def save(self):
+        if not self.dirty:
+            return
+        # -- forget sessions whose files have since been removed
+        self.entries = { e: self.entries[e] for e in self.entries if os.path.exists(os.path.join(self.folder, e)) }
+        tmp_path = "%s.tmp" % self.path
+        with open(tmp_path, 'w') as f:
+            json.dump(self.entries, f)
+        os.replace(tmp_path, self.path)
+        self.dirty = False
@@ -1,6 +1,10 @@
 import os
 import sys
 import subprocess
+import shutil
+import tempfile
+import threading
+import queue
 import logging
 from datetime import datetime
 from sources.source import Source, SourceFile
@@ -28,12 +32,31 @@ logger = logging.getLogger('Android')
 def classdef():
     return Android
 
+# -- one shell call lists every file under a search path with its size and mtime
+STAT_FORMAT = "%s %Y %n"
+# -- files per md5sum shell call when hashing on the device
+MD5_BATCH_SIZE = 50
+
 class Android(Source):
 
     device = None
     search_paths = []
     adb_key_path = None
     ip_address = None 
+    # -- device path -> (size, mtime), collected in verify
+    file_stats = {}
+    # -- pulls kept ahead of the processing loop, bounded by count and total size
+    prefetch_count = 4
+    staging_limit_mb = 1024
+    # -- resolve targets from path, name and stats before pulling, skipping files already there
+    prepull_check = False
+    # -- also md5sum candidates on the device so matches are by content
+    prepull_md5 = False
+
+    @property
+    def max_inflight(self):
+        # -- the puller stages no more than this, so read-ahead mustn't wait on more
+        return max(1, int(self.prefetch_count))
 
     def sigint_handler(self):
         return self._sigint_handler()
@@ -122,15 +145,16 @@ class Android(Source):
         device_success = False 
         any_files = False
         self.files = {}
+        self.file_stats = {}
         while not device_success and device_attempts < 3:
             try:
                 logger.info("Examining filepaths..")                
                 for path in self.search_paths:
                     logger.info(" - %s:" % path)
                     #  -name \"%s\"
-                    cmd_find = 'find \"%s\" -type f%s' % (path, ctime_filter)
+                    cmd_find = 'find \"%s\" -type f%s -exec stat -c \"%s\" {} +' % (path, ctime_filter, STAT_FORMAT)
                     raw_files = device.shell(cmd_find) 
-                    filtered_files = self._filter(raw_files.split('\n'))
+                    filtered_files = self._filter(self._parse_stat_lines(raw_files.split('\n')))
                     logger.info(" - %s: %s files" % (path, len(filtered_files)))
                     if len(filtered_files) > 0:
                         self.files[path] = filtered_files
@@ -152,28 +176,170 @@ class Android(Source):
         logger.warn("Files {}found. Device {} scanning all source paths.".format("" if any_files else "not", "succeeded" if device_success else "failed"))
         return any_files and device_success
 
-    def paths(self):
-        logger.info("source locations: %s" % ",".join(self.files.keys()))
+    def _parse_stat_lines(self, lines):
+        '''
+        Splits '<size> <mtime> <path>' lines into file_stats and returns the paths
+        '''
+        filepaths = []
+        for line in [ l.strip() for l in lines if l.strip() ]:
+            parts = line.split(' ', 2)
+            if len(parts) == 3 and parts[0].isdigit() and parts[1].isdigit():
+                self.file_stats[parts[2]] = (int(parts[0]), int(parts[1]),)
+                filepaths.append(parts[2])
+            else:
+                # -- no stat output for this line, size is looked up at pull time
+                filepaths.append(line)
+        return filepaths
+
+    def _file_size(self, device, filepath):
+        if filepath in self.file_stats:
+            return self.file_stats[filepath][0]
+        size_bytes_output = device.shell("stat \"%s\" | grep Size | cut -d \" \" -f 4" % filepath)
+        return int(size_bytes_output)
+
+    def _device_digests(self, device, filepaths):
+        digests = {}
+        for i in range(0, len(filepaths), MD5_BATCH_SIZE):
+            batch = filepaths[i:i+MD5_BATCH_SIZE]
+            output = device.shell("md5sum %s" % " ".join([ "\"%s\"" % f for f in batch ]))
+            for line in [ l.strip() for l in output.split('\n') if l.strip() ]:
+                parts = line.split(None, 1)
+                if len(parts) == 2:
+                    digests[parts[1]] = parts[0]
+        return digests
+
+    def _skip_resolved_files(self):
+        '''
+        Drops files whose content is already at the target from self.files, before anything is pulled
+        '''
         device = self._get_device()
+        skipped = 0
         for path in self.files:
-            logger.info("location %s:" % path)
+            candidates = [ f for f in self.files[path] if f in self.file_stats and not self._is_processed(f) ]
+            logger.info("Resolving %s files in %s before pulling.." % (len(candidates), path))
+            digests = self._device_digests(device, candidates) if self._is_set(self.prepull_md5) else {}
+            remaining = []
             for filepath in self.files[path]:
-                if self._is_processed(filepath):
-                    logger.info(" - %s found as processed, skipping.." % filepath)
-                    continue
-                filename = filepath.rpartition('/')[-1]
-                if filename.strip() == '':
-                    logger.info(" - stripped filename is empty, skipping..")
+                if filepath in candidates:
+                    (size, mtime,) = self.file_stats[filepath]
+                    sourcefile = SourceFile(filepath, None, stats=os.stat_result((0, 0, 0, 0, 0, 0, size, mtime, mtime, mtime,)))
+                    if self.skip_check(sourcefile, device_digest=digests.get(filepath)):
+                        skipped += 1
+                        continue
+                remaining.append(filepath)
+            self.files[path] = remaining
+        logger.info(" - %s files already at target, not pulling" % skipped)
+
+    def _release_pulled_file(self, sourcefile):
+        logger.info(" - file processed, deleting %s.." % sourcefile.working_path)
+        size = os.path.getsize(sourcefile.working_path) if os.path.exists(sourcefile.working_path) else 0
+        if os.path.exists(sourcefile.working_path):
+            os.remove(sourcefile.working_path)
+        with self.staging:
+            self.staged_count -= 1
+            self.staged_bytes -= size
+            self.staging.notify_all()
+            self._remove_staging_folder()
+
+    def _remove_staging_folder(self):
+        if self.stop_pulling and self.staged_count == 0 and os.path.isdir(self.staging_folder):
+            shutil.rmtree(self.staging_folder)
+
+    def _staging_full(self, size):
+        if self.staged_count >= self.max_inflight:
+            return True
+        # -- the processing loop has taken every staged file (it may be holding them for read-ahead)
+        # -- and is waiting on this one, so it's let in however large
+        if self.queued == 0:
+            return False
+        return self.staged_bytes + size > int(self.staging_limit_mb)*1024*1024
+
+    def _pull_files(self, staging_folder, pulled):
+        '''
+        Runs on the pull thread: pulls files into staging_folder as room allows and
+        queues them for the processing loop, ending with None
+        '''
+        device = self._get_device()
+        pull_count = 0
+        try:
+            for path in self.files:
+                logger.info("location %s:" % path)
+                for filepath in self.files[path]:
+                    if self.stop_pulling:
+                        return
+                    if self._is_processed(filepath):
+                        logger.info(" - %s found as processed, skipping.." % filepath)
+                        continue
+                    filename = filepath.rpartition('/')[-1]
+                    if filename.strip() == '':
+                        logger.info(" - stripped filename is empty, skipping..")
+                        continue
+                    size = self._file_size(device, filepath)
+                    with self.staging:
+                        while self._staging_full(size) and not self.stop_pulling:
+                            self.staging.wait()
+                        if self.stop_pulling:
+                            return
+                        self.staged_count += 1
+                        self.staged_bytes += size
+                    targetfilepath = os.path.join(staging_folder, "%s_%s" % (pull_count, filename))
+                    pull_count += 1
+                    logger.info(" - %s (%.2f MB) -> %s" % (filepath, size*1.0/(1024*1024), targetfilepath))
+                    with self._phase('pull', size):
+                        device.pull(filepath, targetfilepath)
+                    if filepath in self.file_stats:
+                        # -- pulls land with the time of the pull, the file is dated from the device's
+                        mtime = self.file_stats[filepath][1]
+                        os.utime(targetfilepath, (mtime, mtime))
+                    with self.staging:
+                        self.queued += 1
+                    pulled.put(SourceFile(filepath, targetfilepath, release_callback=self._release_pulled_file))
+        except:
+            pulled.put(sys.exc_info()[1])
+        finally:
+            pulled.put(None)
+
+    def paths(self):
+        logger.info("source locations: %s" % ",".join(self.files.keys()))
+        if self.skip_check and self._is_set(self.prepull_check):
+            self._skip_resolved_files()
+        # -- pulled files may outlive the next pull when processing runs ahead, so each gets its own name
+        self.staging_folder = tempfile.mkdtemp(prefix='photobinner_')
+        self.staging = threading.Condition()
+        self.staged_count = 0
+        self.staged_bytes = 0
+        # -- staged files not yet taken by the processing loop
+        self.queued = 0
+        self.stop_pulling = False
+        pulled = queue.Queue()
+        puller = threading.Thread(target=self._pull_files, args=(self.staging_folder, pulled,), daemon=True)
+        puller.start()
+        try:
+            while True:
+                sourcefile = pulled.get()
+                if sourcefile is None:
+                    break
+                if isinstance(sourcefile, Exception):
+                    raise sourcefile
+                with self.staging:
+                    self.queued -= 1
+                    self.staging.notify_all()
+                yield sourcefile
+        finally:
+            with self.staging:
+                self.stop_pulling = True
+                self.staging.notify_all()
+            # -- anything pulled but never handed out is cleaned up here
+            while puller.is_alive() or not pulled.empty():
+                try:
+                    sourcefile = pulled.get(timeout=1)
+                except queue.Empty:
                     continue
-                size_bytes_output = device.shell("stat \"%s\" | grep Size | cut -d \" \" -f 4" % filepath)
-                mb_contents = int(size_bytes_output)*1.0/(1024*1024)
-                targetfilepath = os.path.join('/tmp', filename)
-                logger.info(" - %s (%.2f MB) -> %s" % (filepath, mb_contents, targetfilepath))
-                device.pull(filepath, targetfilepath)
-                yield SourceFile(filepath, targetfilepath)
-                logger.info(" - file yielded to loop, deleting %s.." % targetfilepath)
-                if os.path.exists(targetfilepath):
-                    os.remove(targetfilepath)
+                if isinstance(sourcefile, SourceFile):
+                    sourcefile.release()
+            puller.join()
+            with self.staging:
+                self._remove_staging_folder()
 
 if __name__ == "__main__":
     config = {
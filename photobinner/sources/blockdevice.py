@@ -1,6 +1,9 @@
 import os
 import time
 import sys
+import fcntl
+import struct
+import atexit
 import subprocess
 import logging
 from sources.source import Source, SourceFile
@@ -13,22 +16,69 @@ def classdef():
 
 BLOCK_MOUNT_VERIFICATION_SUBFOLDER = "DCIM"
 
+# -- struct fiemap (fm_start, fm_length, fm_flags, fm_mapped_extents, fm_extent_count, fm_reserved)
+# -- followed by one struct fiemap_extent (fe_logical, fe_physical, fe_length, 2x reserved, fe_flags, 3x reserved)
+FS_IOC_FIEMAP = 0xC020660B
+FIEMAP_HEADER = struct.Struct('=QQIIII')
+FIEMAP_EXTENT = struct.Struct('=QQQQQIIII')
+FIEMAP_MAX_OFFSET = 0xFFFFFFFFFFFFFFFF
+# -- FIEMAP_EXTENT_UNKNOWN | FIEMAP_EXTENT_DELALLOC: no physical location to go by
+FIEMAP_EXTENT_UNPLACED = 0x2 | 0x4
+
+def physical_offset(path):
+    '''
+    Where on the device the file's first extent starts, None if the filesystem won't say (no FIEMAP)
+    '''
+    request = bytearray(FIEMAP_HEADER.pack(0, FIEMAP_MAX_OFFSET, 0, 0, 1, 0) + bytes(FIEMAP_EXTENT.size))
+    try:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            fcntl.ioctl(fd, FS_IOC_FIEMAP, request, True)
+        finally:
+            os.close(fd)
+    except OSError:
+        return None
+    mapped_extents = FIEMAP_HEADER.unpack_from(request)[3]
+    if not mapped_extents:
+        # -- empty, or nothing written out yet
+        return None
+    extent = FIEMAP_EXTENT.unpack_from(request, FIEMAP_HEADER.size)
+    if extent[5] & FIEMAP_EXTENT_UNPLACED:
+        return None
+    return extent[1]
+
 class BlockDevice(Source):
+    '''
+    Mounted once for the session (read-only unless files are moved off it) and listed once,
+    with files read back in on-disk order so a card is read close to sequentially
+    '''
 
     uuid = None
     block_label = None
+    # -- files hinted to the kernel (POSIX_FADV_WILLNEED) ahead of the one being read, 0 for none
+    readahead = 0
+    # -- mounted by verify(), so unmounted by close()
+    mounted = False
+    # -- [(path, stat)] of the wanted files, listed once by verify()
+    listing = None
 
     def _attempt_mount(self):
         if not os.path.exists(self.mountpoint):
             logger.debug(" - creating %s" % self.mountpoint)
             os.makedirs(self.mountpoint)
-        ps_mount = subprocess.Popen(['mount', 'UUID=%s' % self.uuid, self.mountpoint])
-        logger.info("Attempting to mount device..")
+        # -- nothing is written to a card only copied from
+        options = ['-o', 'ro'] if self._is_set(self.read_only) else []
+        ps_mount = subprocess.Popen(['mount'] + options + ['UUID=%s' % self.uuid, self.mountpoint])
+        logger.info("Attempting to mount device%s.." % (" read-only" if options else ""))
         (mountout, mounterr) = ps_mount.communicate(None)
         if mounterr:
             logger.error(mounterr)
         if mountout:
             logger.debug(mountout)
+        if ps_mount.returncode == 0 and not self.mounted:
+            self.mounted = True
+            # -- however the session ends
+            atexit.register(self.close)
         return ps_mount.returncode == 0
 
     def _attempt_umount(self):
@@ -60,7 +110,40 @@ class BlockDevice(Source):
     #     self._attempt_umount()
 
     def sigint_handler(self):
-        return self._sigint_handler(callback=self._attempt_umount)
+        return self._sigint_handler(callback=self.close)
+
+    def close(self):
+        if self.mounted:
+            self.mounted = False
+            self._attempt_umount()
+
+    def _list(self, incremental=False):
+        return [ (entry.path, entry.stat(),) for (current_folder, entry,) in self._walk(incremental=incremental) ]
+
+    def _physical_order(self, files):
+        '''
+        files sorted by where they start on the device, or by folder and inode where the
+        filesystem won't map them (on FAT, inodes follow directory entry order)
+        '''
+        offsets = { path: physical_offset(path) for (path, stats,) in files }
+        if all([ offsets[path] is not None for path in offsets ]):
+            logger.debug(" - ordering %s files by physical offset" % len(files))
+            return sorted(files, key=lambda f: offsets[f[0]])
+        logger.debug(" - ordering %s files by folder and inode" % len(files))
+        return sorted(files, key=lambda f: (os.path.dirname(f[0]), f[1].st_ino,))
+
+    def _advise(self, path):
+        '''
+        Lets the kernel start reading path before it's asked for
+        '''
+        try:
+            fd = os.open(path, os.O_RDONLY)
+            try:
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+            finally:
+                os.close(fd)
+        except (OSError, AttributeError) as e:
+            logger.debug(" - no readahead for %s: %s" % (path, e))
 
     def verify(self):
         mounted = False
@@ -84,16 +167,33 @@ class BlockDevice(Source):
                 time.sleep(3)
         notempty = False
         if mounted:
-            logger.debug(" - mounted, checking if source not empty..")
-            notempty = self._is_not_empty()
-            self._attempt_umount()
+            logger.debug(" - mounted, listing source..")
+            # -- the only walk of the device, paths() reads from this and it stays mounted until close()
+            self.listing = self._list()
+            notempty = len(self.listing) > 0
+            if not notempty:
+                self.close()
         else:
             logger.warn(" - not able to mount the device")
         return notempty
 
     def paths(self):
-        self._attempt_mount()
-        for filepath in self._paths():
-            # -- convention is to yield the original filepath and the modified/accessible filepath (if modified)
-            yield SourceFile(filepath)
-        #self._attempt_umount()
+        if self.listing is None:
+            if not os.path.exists(os.path.join(self.mountpoint, BLOCK_MOUNT_VERIFICATION_SUBFOLDER)):
+                self._attempt_mount()
+            self.listing = self._list(incremental=True)
+        files = []
+        for (path, stats,) in self.listing:
+            if self._is_processed(path):
+                logger.info(" - %s found as processed, skipping.." % path)
+                continue
+            files.append((path, stats,))
+        with self._phase('order'):
+            files = self._physical_order(files)
+        readahead = int(self.readahead or 0)
+        for path in [ path for (path, stats,) in files[:readahead] ]:
+            self._advise(path)
+        for (n, (path, stats,),) in enumerate(files):
+            if readahead and n + readahead < len(files):
+                self._advise(files[n + readahead][0])
+            yield SourceFile(path, stats=stats)
@@ -18,9 +18,9 @@ class Folder(Source):
         return self._is_not_empty()
 
     def paths(self):
-        for filepath in self._paths():
+        for sourcefile in self._paths():
             # -- convention is to yield the original filepath and the modified/accessible filepath (if modified)
-            yield SourceFile(filepath)
+            yield sourcefile
         logger.info("Now processing stitch folders (BlockDevice)..")
         for stitch_folder in self._stitch_folders():
             yield StitchFolder(stitch_folder)
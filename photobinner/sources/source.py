@@ -3,6 +3,8 @@ import sys
 import subprocess
 import logging
 import re
+import hashlib
+from contextlib import nullcontext
 from abc import ABCMeta, abstractmethod
 
 # - some pics/ folders are outside the purview of sorting/fixing scripts
@@ -18,17 +20,41 @@ FIX_EXCLUDES = [
     '/media/storage/pics/Albums',
     '/media/storage/pics/inbox/exact_matches'
 ]
+# -- compared against each folder's absolute path, so both the given and resolved form are kept
+FIX_EXCLUDE_PATHS = frozenset([ os.path.abspath(p) for p in FIX_EXCLUDES ] + [ os.path.realpath(p) for p in FIX_EXCLUDES ])
 
 DEFAULT_MASK = "*"
 
+MEDIA_EXTENSIONS = frozenset(["jpg", "gif", "png", "raw", "mov", "crw", "cr2", "avi", "mp3", "mp4", "bmp", "psd", "tiff"])
+VIDEO_EXTENSIONS = frozenset(["mov", "avi", "mp4"])
+
+def file_extension(filename):
+    return filename.rpartition('.')[-1].lower()
+
 class SourceFile():
 
     original_path = None
     working_path = None
+    # -- ExifWrapper shared by every step that reads this file's metadata
+    metadata = None
+    # -- os.stat of working_path, if already taken
+    stats = None
+    # -- decoded for the near-duplicate pass, if read ahead
+    thumbnail = None
+    release_callback = None
 
     def __init__(self, *args, **kwargs):
         self.original_path = args[0]
         self.working_path = args[1] if len(args) > 1 else self.original_path
+        self.release_callback = kwargs.get('release_callback')
+        self.stats = kwargs.get('stats')
+
+    def release(self):
+        '''
+        Called once the file is processed so the source can clean up its working copy
+        '''
+        if self.release_callback:
+            self.release_callback(self)
 
 class StitchFolder(SourceFile):
     pass
@@ -42,16 +68,36 @@ class Source():
     target = None
     exclude_descriptive = None
     transfer_method = None
+    # -- set by PhotoBinner: True unless files are moved off the source
+    read_only = False
     filename_mask = "*.mp4"
     from_date = None
     mask = DEFAULT_MASK
-    processed_files = []
+    mask_pattern = None
+    processed_files = None
     stitch_folder_match = "^STITCH_[0-9]+$"
-    stitch_folders = []
+    # -- set by PhotoBinner: skip_check(sourcefile) is True if the file is already at the target
+    # -- judged without reading its content (sourcefile.working_path is None)
+    skip_check = None
+    stitch_folders = None
+    # -- folder -> {inode, mtime_ns, entries, filter, subfolders, stitch_folders} from the last complete walk
+    # -- a folder whose inode, mtime and entry count still match, walked for the same files, is not
+    # -- listed again (unless full_rescan)
+    manifest = None
+    full_rescan = False
+    # -- set by PhotoBinner for the run, phases timed by the source land in the run's stats
+    phase_timer = None
+    # -- most files paths() has out at once before any is released, None for no limit
+    max_inflight = None
 
     def __init__(self, *args, **kwargs):
         logging.basicConfig(level=logging.DEBUG)
         self.logger = logging.getLogger(__name__)
+        self.processed_files = set()
+        self.stitch_folders = []
+        self.manifest = {}
+        self.walked_manifest = {}
+        self.failed_folders = set()
         for k in kwargs:
             val = kwargs[k]
             if type(kwargs[k]) == str and kwargs[k].count(",") > 0:
@@ -71,22 +117,48 @@ class Source():
     def sigint_handler(self):
         pass
 
+    def close(self):
+        '''
+        Called once the session is done with the source, e.g. to unmount it
+        '''
+        pass
+
+    def _phase(self, name, size=0):
+        return self.phase_timer.phase(name, size) if self.phase_timer else nullcontext()
+
+    def _is_set(self, value):
+        '''
+        Options read from ~/.pbrc arrive as strings
+        '''
+        if isinstance(value, str):
+            return value.strip().lower() in ('true', 'yes', 'on', '1')
+        return bool(value)
+
     def _filter_media_files(self, filenames):
-        return [ f for f in filenames if f[0:2] != "._" and (f[-3:].lower() in ("jpg", "gif", "png", "raw", "mov", "crw", "cr2", "avi", "mp3", "mp4", "bmp", "psd") or f[-4:] in ("tiff")) ]
+        return [ f for f in filenames if f[0:2] != "._" and file_extension(f) in MEDIA_EXTENSIONS ]
 
     def _filter_video_files(self, filenames):
-        return [ f for f in filenames if f[0:2] != "._" and f[-3:].lower() in ("mov", "avi", "mp4") ]
+        return [ f for f in filenames if f[0:2] != "._" and file_extension(f) in VIDEO_EXTENSIONS ]
 
     def _filter_mask(self, filenames):
-        return [ f for f in filenames if f[0:2] != "._" and f[-3:].lower() in ("mov", "avi", "mp4") ]
+        return self._filter_video_files(filenames)
+
+    def _is_wanted(self, filename):
+        '''
+        Single-file form of _filter: a media file, or a match for the user's mask
+        '''
+        if self.mask == DEFAULT_MASK:
+            return filename[0:2] != "._" and file_extension(filename) in MEDIA_EXTENSIONS
+        if not self.mask_pattern:
+            self.mask_pattern = re.compile(self.mask)
+        return self.mask_pattern.match(filename) is not None
 
     def _filter(self, filenames):
         if self.mask == DEFAULT_MASK:
             self.logger.debug("Filtering for media files only..")
-            return self._filter_media_files(filenames)
         else:
             self.logger.debug("Applying mask '%s'" % self.mask)
-            filenames = [ f for f in filenames if re.match(self.mask, f) ]
+        return [ f for f in filenames if self._is_wanted(f) ]
 
     def _is_not_empty(self):
         self.logger.debug("Checking if not empty: %s" % self.mountpoint)
@@ -97,34 +169,110 @@ class Source():
             notempty = True
             self.logger.debug(" - source exists as a file")
         else:
-            for (current_folder, dirnames, filenames) in os.walk(self.mountpoint, topdown=True):
-                filenames = self._filter(filenames)
-                self.logger.debug(" - %s: %s files" % (current_folder, len(filenames)))
-                if len(filenames) > 0:
-                    notempty = True
-                    break
+            for (current_folder, entry,) in self._walk():
+                self.logger.debug(" - %s: found %s" % (current_folder, entry.name))
+                notempty = True
+                break
         return notempty
 
+    def _filter_key(self):
+        '''
+        Stands for what decides which files a walk yields, so a manifest taken for other files doesn't apply
+        '''
+        return hashlib.md5(("%s|%s|%s" % (self.mask, ",".join(sorted(MEDIA_EXTENSIONS)), self.stitch_folder_match)).encode('utf-8')).hexdigest()
+
+    def _entry_count(self, folder):
+        '''
+        Names in folder, None if it can't be read. A listing without a stat per file.
+        '''
+        try:
+            return len(os.listdir(folder))
+        except OSError:
+            return None
+
     def _is_processed(self, filepath):
         return filepath in self.processed_files
 
-    def _paths(self):
+    def _walk(self, incremental=False):
+        '''
+        Yields (folder, DirEntry) for each wanted file under the mountpoint, depth first in
+        listing order, not descending into excluded or stitch folders. If incremental, folders
+        unchanged since the manifest was taken aren't listed, only their subfolders are visited.
+        '''
         self.logger.debug("Walking %s.." % self.mountpoint)
         self.logger.debug("Excluding folders: %s" % FIX_EXCLUDES)
-        for (current_folder, dirnames, filenames) in os.walk(self.mountpoint, topdown=True):
-            self.stitch_folders.extend([ os.path.join(self.mountpoint, d) for d in dirnames if re.search(self.stitch_folder_match, d) ])
-            self.logger.info(" - %s stitch folders found: %s" % (len(self.stitch_folders), ",".join(self.stitch_folders)))
-            dirnames[:] = [ d for d in dirnames if os.path.abspath(d) not in FIX_EXCLUDES and not re.search(self.stitch_folder_match, d) ]
-            image_files = self._filter(filenames)
-            for filename in image_files:
-                filepath = os.path.join(current_folder, filename)
-                if self._is_processed(filepath):
-                    self.logger.info(" - %s found as processed, skipping.." % filepath)
-                    continue
-                yield filepath
+        stitch_folder_pattern = re.compile(self.stitch_folder_match)
+        use_manifest = incremental and not self._is_set(self.full_rescan)
+        filter_key = self._filter_key()
+        self.stitch_folders = []
+        self.walked_manifest = {}
+        folders = [self.mountpoint]
+        while folders:
+            current_folder = folders.pop()
+            try:
+                # -- taken before listing, so a change made while listing shows up next time
+                folder_stats = os.stat(current_folder)
+            except OSError as oe:
+                self.logger.warning(" - cannot read %s: %s" % (current_folder, oe))
+                continue
+            known = self.manifest.get(current_folder) if use_manifest else None
+            if known and known['inode'] == folder_stats.st_ino and known['mtime_ns'] == folder_stats.st_mtime_ns and known.get('filter') == filter_key and known['entries'] == self._entry_count(current_folder):
+                self.logger.debug(" - %s unchanged, not listing" % current_folder)
+                self.walked_manifest[current_folder] = known
+                self.stitch_folders.extend(known['stitch_folders'])
+                folders.extend(reversed(known['subfolders']))
+                continue
+            subfolders = []
+            stitch_folders = []
+            try:
+                entries = list(os.scandir(current_folder))
+            except OSError as oe:
+                self.logger.warning(" - cannot read %s: %s" % (current_folder, oe))
+                continue
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if stitch_folder_pattern.search(entry.name):
+                        stitch_folders.append(entry.path)
+                        self.logger.debug(" - stitch folder found: %s" % entry.path)
+                    elif os.path.abspath(entry.path) not in FIX_EXCLUDE_PATHS:
+                        subfolders.append(entry.path)
+                elif self._is_wanted(entry.name) and entry.is_file():
+                    yield (current_folder, entry,)
+            self.stitch_folders.extend(stitch_folders)
+            self.walked_manifest[current_folder] = {
+                'inode': folder_stats.st_ino,
+                'mtime_ns': folder_stats.st_mtime_ns,
+                'entries': len(entries),
+                'filter': filter_key,
+                'subfolders': subfolders,
+                'stitch_folders': stitch_folders
+            }
+            folders.extend(reversed(subfolders))
+
+    def mark_failed(self, filepath):
+        '''
+        Keeps the file's folder out of the next manifest, so the file is looked at again
+        '''
+        self.failed_folders.add(os.path.dirname(filepath))
+
+    def completed_manifest(self):
+        '''
+        The manifest to keep after a walk that ran to the end
+        '''
+        return { f: self.walked_manifest[f] for f in self.walked_manifest if f not in self.failed_folders }
+
+    def _paths(self):
+        '''
+        Yields a SourceFile, carrying the walk's stat, for each unprocessed file
+        '''
+        for (current_folder, entry,) in self._walk(incremental=True):
+            if self._is_processed(entry.path):
+                self.logger.info(" - %s found as processed, skipping.." % entry.path)
+                continue
+            yield SourceFile(entry.path, stats=entry.stat())
 
     def _stitch_folders(self):
-        self.logger.info("Now processing stitch folders (Source)..")
+        self.logger.info("Now processing %s stitch folders (Source).." % len(self.stitch_folders))
         for stitch_folder in self.stitch_folders:
             yield stitch_folder
 
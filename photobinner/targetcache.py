@@ -0,0 +1,65 @@
+#!/usr/bin/python
+
+import os
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+class TargetCache(object):
+    '''
+    In-memory listings of target folders, each read once on first use and kept up to date
+    as files are written, so existence checks and dupe slot probing don't go back to disk.
+    Changes made to the target by anything else during the run are not seen.
+    Safe to share between threads.
+    '''
+
+    def __init__(self, *args, **kwargs):
+        # -- folder -> set of entry names, or None if the folder doesn't exist
+        self.listings = {}
+        self.lock = threading.RLock()
+
+    def _listing(self, folder):
+        if folder not in self.listings:
+            try:
+                self.listings[folder] = set(os.listdir(folder))
+            except (FileNotFoundError, NotADirectoryError):
+                self.listings[folder] = None
+        return self.listings[folder]
+
+    def exists(self, path):
+        with self.lock:
+            (folder, name,) = os.path.split(path)
+            listing = self._listing(folder)
+            return listing is not None and name in listing
+
+    def isdir(self, folder):
+        with self.lock:
+            return self._listing(folder) is not None
+
+    def add(self, path):
+        '''
+        Records a file or folder written at path
+        '''
+        with self.lock:
+            (folder, name,) = os.path.split(path)
+            if folder not in self.listings:
+                # -- never read, it'll be read fresh if needed
+                return
+            if self.listings[folder] is None:
+                # -- the folder was created along with path
+                self.listings[folder] = set()
+                self.add(folder)
+            self.listings[folder].add(name)
+
+    def add_folder(self, folder):
+        with self.lock:
+            if not self.listings.get(folder):
+                self.listings[folder] = set()
+            self.add(folder)
+
+    def remove(self, path):
+        with self.lock:
+            (folder, name,) = os.path.split(path)
+            if self.listings.get(folder):
+                self.listings[folder].discard(name)
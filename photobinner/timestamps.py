@@ -0,0 +1,72 @@
+#!/usr/bin/python
+
+from datetime import datetime
+
+'''
+Fixed-width parsers for the timestamp forms photobinner reads, and timezone
+localization that looks up each (timezone, day)'s UTC offset once.
+'''
+
+# -- tried, in order, for EXIF values that aren't exactly 'YYYY:MM:DD HH:MM:SS'
+EXIF_FORMATS = ["%Y:%m:%d %H:%M:%S", "%Y:%m:%d %H:%M: %S"]
+
+# -- (tz, (year, month, day)) -> the tzinfo for every time that day, None for DST change days
+_tzinfo_cache = {}
+
+def parse_exif(value):
+    '''
+    EXIF 'YYYY:MM:DD HH:MM:SS' -> naive datetime, None if value isn't a valid timestamp
+    (cameras without a clock write '0000:00:00 00:00:00')
+    '''
+    value = str(value)
+    if len(value) == 19 and value[4] == ':' and value[7] == ':' and value[10] == ' ' and value[13] == ':' and value[16] == ':':
+        try:
+            return datetime(int(value[0:4]), int(value[5:7]), int(value[8:10]), int(value[11:13]), int(value[14:16]), int(value[17:19]))
+        except ValueError:
+            return None
+    for format in EXIF_FORMATS:
+        try:
+            return datetime.strptime(value, format)
+        except ValueError:
+            pass
+    return None
+
+def parse_compact(value):
+    '''
+    'YYYYMMDD_HHMMSS' or 'YYYYMMDD-HHMMSS' -> naive datetime, ValueError if it isn't a valid one
+    '''
+    if len(value) != 15 or value[8] not in '_-':
+        raise ValueError("'%s' is not a YYYYMMDD_HHMMSS timestamp" % value)
+    return datetime(int(value[0:4]), int(value[4:6]), int(value[6:8]), int(value[9:11]), int(value[11:13]), int(value[13:15]))
+
+def parse_date(value):
+    '''
+    'YYYY_MM_DD' or 'YYYY-MM-DD' -> naive datetime at midnight, ValueError if it isn't a valid one
+    '''
+    if len(value) != 10:
+        raise ValueError("'%s' is not a YYYY-MM-DD date" % value)
+    return datetime(int(value[0:4]), int(value[5:7]), int(value[8:10]))
+
+def localize(tz, naive):
+    '''
+    Same as pytz's tz.localize(naive), with the offset looked up once per day. On days the
+    offset changes (DST) every time is still localized on its own.
+    '''
+    key = (tz, (naive.year, naive.month, naive.day),)
+    if key not in _tzinfo_cache:
+        start = tz.localize(datetime(naive.year, naive.month, naive.day))
+        end = tz.localize(datetime(naive.year, naive.month, naive.day, 23, 59, 59))
+        _tzinfo_cache[key] = start.tzinfo if start.tzinfo is end.tzinfo else None
+    tzinfo = _tzinfo_cache[key]
+    if tzinfo is None:
+        return tz.localize(naive)
+    return naive.replace(tzinfo=tzinfo)
+
+def day_key(d):
+    return (d.year, d.month, d.day,)
+
+def minute_key(d):
+    '''
+    The wall-clock minute, for comparisons that used to be strftime("%Y-%m-%d %H:%M") equality
+    '''
+    return (d.year, d.month, d.day, d.hour, d.minute,)
@@ -0,0 +1,209 @@
+#!/usr/bin/python
+
+import os
+import time
+import errno
+import fcntl
+import shutil
+import hashlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+# -- linux/fs.h: _IOW(0x94, 9, int), share the source's extents (btrfs, XFS)
+FICLONE = 0x40049409
+COPY_CHUNK_SIZE = 1024*1024
+DEFAULT_DIGEST = 'md5'
+# -- errors meaning "this method isn't available here", try the next one
+FALLBACK_ERRNOS = (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTTY, errno.EBADF, errno.EPERM)
+
+# -- while hashing, the chunked methods copy this much at a time and read it back for the
+# -- hasher from the source's page cache, still warm from the copy
+HASH_WINDOW = 16*COPY_CHUNK_SIZE
+
+def _hash_range(fd, hasher, offset, length):
+    end = offset + length
+    while offset < end:
+        chunk = os.pread(fd, min(COPY_CHUNK_SIZE, end - offset), offset)
+        if not chunk:
+            break
+        hasher.update(chunk)
+        offset += len(chunk)
+
+# -- each copy method returns the number of bytes it copied, feeding them to hasher if given
+
+def _reflink(src_fd, dest_fd, size, hasher=None):
+    fcntl.ioctl(dest_fd, FICLONE, src_fd)
+    copied = os.fstat(dest_fd).st_size
+    if hasher:
+        # -- the clone itself reads nothing, this is the one pass over the data
+        _hash_range(src_fd, hasher, 0, copied)
+    return copied
+
+def _copy_file_range(src_fd, dest_fd, size, hasher=None):
+    offset = 0
+    while offset < size:
+        count = min(size - offset, HASH_WINDOW) if hasher else size - offset
+        copied = os.copy_file_range(src_fd, dest_fd, count, offset, offset)
+        if copied == 0:
+            break
+        if hasher:
+            _hash_range(src_fd, hasher, offset, copied)
+        offset += copied
+    return offset
+
+def _sendfile(src_fd, dest_fd, size, hasher=None):
+    offset = 0
+    os.lseek(dest_fd, 0, os.SEEK_SET)
+    while offset < size:
+        count = min(size - offset, HASH_WINDOW) if hasher else size - offset
+        sent = os.sendfile(dest_fd, src_fd, offset, count)
+        if sent == 0:
+            break
+        if hasher:
+            _hash_range(src_fd, hasher, offset, sent)
+        offset += sent
+    return offset
+
+def _buffered(src_fd, dest_fd, size, hasher=None):
+    '''
+    Plain read/write loop, also feeding each chunk to hasher if given
+    '''
+    copied = 0
+    os.lseek(src_fd, 0, os.SEEK_SET)
+    os.lseek(dest_fd, 0, os.SEEK_SET)
+    while True:
+        chunk = os.read(src_fd, COPY_CHUNK_SIZE)
+        if not chunk:
+            break
+        if hasher:
+            hasher.update(chunk)
+        view = memoryview(chunk)
+        while view:
+            written = os.write(dest_fd, view)
+            view = view[written:]
+        copied += len(chunk)
+    return copied
+
+# -- fastest first, each is tried until one works on this pair of filesystems
+COPY_METHODS = [('reflink', _reflink)]
+if hasattr(os, 'copy_file_range'):
+    COPY_METHODS.append(('copy_file_range', _copy_file_range))
+if hasattr(os, 'sendfile'):
+    COPY_METHODS.append(('sendfile', _sendfile))
+COPY_METHODS.append(('buffered', _buffered))
+
+def _preallocate(dest_fd, size):
+    if size > 0 and hasattr(os, 'posix_fallocate'):
+        try:
+            os.posix_fallocate(dest_fd, 0, size)
+        except OSError:
+            pass
+
+def _result(method, size, start):
+    seconds = time.monotonic() - start
+    return {
+        'method': method,
+        'bytes': size,
+        'seconds': seconds,
+        'mb_per_second': (size/(1024*1024))/seconds if seconds > 0 else None
+    }
+
+def file_digest(path, digest):
+    hasher = hashlib.new(digest)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(COPY_CHUNK_SIZE), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+def _copy_with_fallback(src_fd, dest_fd, size, digest=None):
+    '''
+    Tries each of COPY_METHODS in turn, returning the name of the one that worked, the
+    number of bytes it copied and, with digest, the hasher it fed
+    '''
+    for (name, copy_method,) in COPY_METHODS:
+        # -- a fresh hasher each time, a method that failed part way may have fed the last one
+        hasher = hashlib.new(digest) if digest else None
+        try:
+            return (name, copy_method(src_fd, dest_fd, size, hasher), hasher,)
+        except OSError as oe:
+            if oe.errno not in FALLBACK_ERRNOS or copy_method == _buffered:
+                raise
+            logger.debug(" - %s not available (%s), falling back" % (name, oe.strerror))
+            # -- start the next method from a clean, preallocated file
+            os.ftruncate(dest_fd, 0)
+            _preallocate(dest_fd, size)
+
+def copy_file(src, dest, time_tuple=None, digest=None, verify=False, source_digest=None):
+    '''
+    Copies src to dest with the fastest method the filesystems allow, keeping mode and
+    setting atime/mtime (time_tuple, or the source's) on the open file. Returns a dict of
+    method, bytes, seconds and throughput. Directories are handed to shutil.
+
+    With digest (a hashlib name) the source is hashed in the same pass as the copy and the
+    result carries its digest, unless the caller already has it as source_digest. With
+    verify, dest is read back and checked against that digest (md5 if no digest is given).
+    Either way a copy shorter than the source raises IOError, and a copy that fails or
+    doesn't verify is removed from dest.
+    '''
+    start = time.monotonic()
+    if os.path.isdir(src):
+        shutil.copytree(src, dest)
+        return _result('shutil', 0, start)
+    src_fd = os.open(src, os.O_RDONLY)
+    try:
+        src_stats = os.fstat(src_fd)
+        size = src_stats.st_size
+        dest_fd = os.open(dest, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, src_stats.st_mode & 0o777)
+        try:
+            if verify and not digest:
+                digest = DEFAULT_DIGEST
+            try:
+                (method, copied, hasher,) = _copy_with_fallback(src_fd, dest_fd, size, None if source_digest else digest)
+                if copied != size:
+                    raise IOError("short copy of %s: %s of %s bytes" % (src, copied, size))
+                # -- preallocation may have left dest longer than what was copied
+                os.ftruncate(dest_fd, size)
+                os.fchmod(dest_fd, src_stats.st_mode & 0o7777)
+                os.utime(dest_fd, time_tuple if time_tuple else (src_stats.st_atime, src_stats.st_mtime))
+            finally:
+                os.close(dest_fd)
+            result = _result(method, size, start)
+            if hasher or source_digest:
+                result['digest'] = hasher.hexdigest() if hasher else source_digest
+            if verify:
+                if file_digest(dest, digest) != result['digest']:
+                    raise IOError("verification failed for %s -> %s" % (src, dest))
+        except:
+            # -- a short or mismatched copy left at dest would pass for the file on the next run
+            os.unlink(dest)
+            raise
+    finally:
+        os.close(src_fd)
+    return result
+
+def move_file(src, dest, time_tuple=None, digest=None, verify=False, source_digest=None):
+    '''
+    Renames src to dest if on the same filesystem, otherwise copies it (see copy_file) and
+    removes src once the copy is complete. Directories are handed to shutil. A rename reads
+    no data, so its result only has source_digest, if given.
+    '''
+    start = time.monotonic()
+    if os.path.isdir(src):
+        shutil.move(src, dest)
+        return _result('shutil', 0, start)
+    size = os.path.getsize(src)
+    try:
+        os.rename(src, dest)
+    except OSError as oe:
+        if oe.errno != errno.EXDEV:
+            raise
+        result = copy_file(src, dest, time_tuple, digest=digest, verify=verify, source_digest=source_digest)
+        os.unlink(src)
+        return result
+    if time_tuple:
+        os.utime(dest, time_tuple)
+    result = _result('rename', size, start)
+    if source_digest:
+        result['digest'] = source_digest
+    return result
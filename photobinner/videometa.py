@@ -0,0 +1,148 @@
+#!/usr/bin/python
+
+import os
+import struct
+import logging
+from datetime import datetime, timedelta, timezone
+import timestamps
+
+logger = logging.getLogger(__name__)
+
+'''
+Creation time of QuickTime/MP4 (moov/mvhd) and AVI (IDIT) videos, reading only atom and
+chunk headers: the media data is skipped by seeking past it, never read.
+'''
+
+CREATION_TAG = 'Video CreationTime'
+
+# -- mvhd times are seconds since this, in UTC
+QUICKTIME_EPOCH = datetime(1904, 1, 1, tzinfo=timezone.utc)
+# -- atom types seen at the start of QuickTime/MP4 files
+QUICKTIME_ATOMS = frozenset([b'ftyp', b'moov', b'mdat', b'free', b'skip', b'wide', b'pnot'])
+# -- ftyp major brands of stills in the same (ISO base media) container: HEIF/HEIC, AVIF, Canon CR3.
+# -- Their dates are in EXIF, left to exifread.
+IMAGE_BRANDS = frozenset([b'heic', b'heix', b'heim', b'heis', b'hevc', b'hevx', b'hevm', b'hevs', b'mif1', b'msf1', b'avif', b'avis', b'crx '])
+# -- atoms or chunks looked at per level before giving up on a file
+MAX_ENTRIES = 256
+# -- IDIT is a short date string
+IDIT_READ_SIZE = 64
+IDIT_FORMATS = ["%a %b %d %H:%M:%S %Y", "%Y/%m/%d %H:%M:%S", "%Y/%m/%d/ %H:%M"]
+
+def _atoms(fd, start, end):
+    '''
+    Yields (type, body offset, end offset) for each atom between start and end
+    '''
+    offset = start
+    for n in range(MAX_ENTRIES):
+        if offset + 8 > end:
+            return
+        header = os.pread(fd, 16, offset)
+        if len(header) < 8:
+            return
+        (size, kind,) = struct.unpack('>I4s', header[:8])
+        body = offset + 8
+        if size == 1:
+            if len(header) < 16:
+                return
+            (size,) = struct.unpack('>Q', header[8:16])
+            body = offset + 16
+        elif size == 0:
+            # -- runs to the end of its container
+            size = end - offset
+        if offset + size < body:
+            logger.debug("malformed %s atom at %s" % (kind, offset))
+            return
+        yield (kind, body, offset + size,)
+        offset += size
+
+def _quicktime_creation(fd, size):
+    '''
+    The mvhd creation time, None if it's not set, or False if there's no moov/mvhd
+    '''
+    for (kind, body, end,) in _atoms(fd, 0, size):
+        if kind != b'moov':
+            continue
+        for (child, child_body, child_end,) in _atoms(fd, body, end):
+            if child != b'mvhd':
+                continue
+            data = os.pread(fd, 12, child_body)
+            if len(data) < 12:
+                return None
+            # -- version 1 has 64-bit times
+            (seconds,) = struct.unpack('>Q', data[4:12]) if data[0] == 1 else struct.unpack('>I', data[4:8])
+            # -- 0 is 'not set'
+            return QUICKTIME_EPOCH + timedelta(seconds=seconds) if seconds else None
+        return False
+    return False
+
+def _riff_chunks(fd, start, end):
+    '''
+    Yields (id, data offset, size) for each chunk between start and end
+    '''
+    offset = start
+    for n in range(MAX_ENTRIES):
+        if offset + 8 > end:
+            return
+        header = os.pread(fd, 8, offset)
+        if len(header) < 8:
+            return
+        (chunk_id, size,) = struct.unpack('<4sI', header)
+        yield (chunk_id, offset + 8, size,)
+        # -- chunks are padded to an even length
+        offset += 8 + size + (size % 2)
+
+def _parse_idit(raw):
+    value = " ".join(raw.split(b'\x00', 1)[0].decode('latin-1').split())
+    parsed = timestamps.parse_exif(value)
+    if parsed:
+        return parsed
+    for format in IDIT_FORMATS:
+        try:
+            return datetime.strptime(value, format)
+        except ValueError:
+            pass
+    logger.debug("unrecognized IDIT date '%s'" % value)
+    return None
+
+def _avi_creation(fd, size):
+    (riff_size,) = struct.unpack('<I', os.pread(fd, 4, 4))
+    end = min(size, 8 + riff_size)
+    for (chunk_id, data, chunk_size,) in _riff_chunks(fd, 12, end):
+        if chunk_id == b'IDIT':
+            return _parse_idit(os.pread(fd, min(chunk_size, IDIT_READ_SIZE), data))
+        if chunk_id != b'LIST':
+            continue
+        list_type = os.pread(fd, 4, data)
+        if list_type == b'movi':
+            # -- the media data, the headers are all before it
+            return None
+        if list_type == b'hdrl':
+            for (child_id, child_data, child_size,) in _riff_chunks(fd, data + 4, data + chunk_size):
+                if child_id == b'IDIT':
+                    return _parse_idit(os.pread(fd, min(child_size, IDIT_READ_SIZE), child_data))
+    return None
+
+def read_video_tags(filepath):
+    '''
+    {CREATION_TAG: datetime} from a QuickTime/MP4 mvhd (aware, UTC) or an AVI IDIT chunk
+    (naive, the camera's local time), {} if the container has no creation time, or None
+    if filepath isn't a video read here (including HEIC/AVIF/CR3 stills, and QuickTime/MP4
+    files with no movie header)
+    '''
+    fd = os.open(filepath, os.O_RDONLY)
+    try:
+        size = os.fstat(fd).st_size
+        head = os.pread(fd, 12, 0)
+        if head[4:8] == b'ftyp' and head[8:12] in IMAGE_BRANDS:
+            return None
+        if head[4:8] in QUICKTIME_ATOMS:
+            creation = _quicktime_creation(fd, size)
+            if creation is False:
+                return None
+        elif head[0:4] == b'RIFF' and head[8:12] == b'AVI ':
+            creation = _avi_creation(fd, size)
+        else:
+            return None
+    finally:
+        os.close(fd)
+    return { CREATION_TAG: creation } if creation else {}
@@ -0,0 +1,65 @@
+#!/usr/bin/python
+
+import os
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from prefetch import ordered_prefetch
+from sources.android import Android
+
+SEARCH_PATH = '/sdcard/DCIM/Camera'
+# -- what --workers 2 asks of ordered_prefetch (workers*PREFETCH_DEPTH)
+WORKERS_WINDOW = 8
+
+class FakeDevice(object):
+    '''
+    Serves pulls from memory in place of an ADB connection
+    '''
+
+    available = True
+
+    def __init__(self, files):
+        self.files = files
+
+    def pull(self, device_path, local_path):
+        with open(local_path, 'wb') as f:
+            f.write(self.files[device_path])
+
+class TestAndroidStaging(unittest.TestCase):
+
+    def _android(self, count, size, **kwargs):
+        files = { "%s/IMG_%04d.jpg" % (SEARCH_PATH, n): os.urandom(size) for n in range(count) }
+        android = Android(search_paths=[SEARCH_PATH], **kwargs)
+        android.device = FakeDevice(files)
+        android.files = { SEARCH_PATH: sorted(files) }
+        android.file_stats = { f: (size, 0,) for f in files }
+        return android
+
+    def _consume(self, android):
+        '''
+        Reads every file through the read-ahead window the processing loop would use,
+        returning the paths handed out, or None if it didn't finish
+        '''
+        consumed = []
+        def run():
+            window = min(WORKERS_WINDOW, android.max_inflight)
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                for sf in ordered_prefetch(android.paths(), lambda sf: os.path.getsize(sf.working_path), executor, window, discard=lambda sf: sf.release()):
+                    consumed.append(sf.original_path)
+                    sf.release()
+        consumer = threading.Thread(target=run, daemon=True)
+        consumer.start()
+        consumer.join(20)
+        return None if consumer.is_alive() else consumed
+
+    def test_window_clamped_to_staging(self):
+        android = self._android(20, 1024, prefetch_count=4)
+        self.assertEqual(self._consume(android), sorted(android.file_stats))
+        self.assertFalse(os.path.exists(android.staging_folder))
+
+    def test_files_over_staging_limit(self):
+        android = self._android(10, 2*1024*1024, prefetch_count=4, staging_limit_mb=1)
+        self.assertEqual(self._consume(android), sorted(android.file_stats))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+#!/usr/bin/python
+
+import os
+import shutil
+import tempfile
+import unittest
+import sources.blockdevice as blockdevice
+from sources.blockdevice import BlockDevice, BLOCK_MOUNT_VERIFICATION_SUBFOLDER
+
+class FakeProcess(object):
+
+    returncode = 0
+
+    def communicate(self, input):
+        return (None, None,)
+
+class TestBlockDevice(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.mountpoint = os.path.join(self.folder, 'card')
+        self.commands = []
+        self.exit_handlers = []
+        self.popen = blockdevice.subprocess.Popen
+        self.register = blockdevice.atexit.register
+        self.physical_offset = blockdevice.physical_offset
+        blockdevice.subprocess.Popen = self._popen
+        blockdevice.atexit.register = self.exit_handlers.append
+
+    def tearDown(self):
+        blockdevice.subprocess.Popen = self.popen
+        blockdevice.atexit.register = self.register
+        blockdevice.physical_offset = self.physical_offset
+        shutil.rmtree(self.folder)
+
+    def _popen(self, command, *args, **kwargs):
+        '''
+        Stands in for mount and umount: mounting puts the card's files in place
+        '''
+        self.commands.append(command)
+        if command[0] == 'mount':
+            for name in ['IMG_0003.JPG', 'IMG_0001.JPG', 'IMG_0002.JPG']:
+                self._touch(os.path.join(self.mountpoint, BLOCK_MOUNT_VERIFICATION_SUBFOLDER, '100CANON', name))
+            self._touch(os.path.join(self.mountpoint, BLOCK_MOUNT_VERIFICATION_SUBFOLDER, '101CANON', 'IMG_0004.JPG'))
+        return FakeProcess()
+
+    def _touch(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(path)
+
+    def _device(self, **kwargs):
+        return BlockDevice(mountpoint=self.mountpoint, uuid='0782-073F', **kwargs)
+
+    def _names(self, device):
+        return [ os.path.basename(sf.original_path) for sf in device.paths() ]
+
+    def test_mounted_read_only_once_and_closed_at_exit(self):
+        device = self._device(read_only=True)
+        self.assertTrue(device.verify())
+        self.assertEqual(len(self._names(device)), 4)
+        # -- paths() reads verify's listing, it doesn't mount or walk again
+        self.assertEqual(self.commands, [['mount', '-o', 'ro', 'UUID=0782-073F', self.mountpoint]])
+        self.assertEqual(self.exit_handlers, [device.close])
+        device.close()
+        device.close()
+        self.assertEqual(self.commands[1:], [['umount', self.mountpoint]])
+
+    def test_mounted_writable_for_moves(self):
+        device = self._device(read_only=False)
+        self.assertTrue(device.verify())
+        self.assertEqual(self.commands, [['mount', 'UUID=0782-073F', self.mountpoint]])
+
+    def test_ordered_by_physical_offset(self):
+        # -- laid out on the device against name and folder order
+        offsets = { 'IMG_0004.JPG': 100, 'IMG_0002.JPG': 200, 'IMG_0003.JPG': 300, 'IMG_0001.JPG': 400 }
+        blockdevice.physical_offset = lambda path: offsets[os.path.basename(path)]
+        device = self._device(read_only=True)
+        device.verify()
+        self.assertEqual(self._names(device), ['IMG_0004.JPG', 'IMG_0002.JPG', 'IMG_0003.JPG', 'IMG_0001.JPG'])
+
+    def test_ordered_by_folder_and_inode_without_offsets(self):
+        offsets = { 'IMG_0004.JPG': 100, 'IMG_0002.JPG': None, 'IMG_0003.JPG': 300, 'IMG_0001.JPG': 400 }
+        blockdevice.physical_offset = lambda path: offsets[os.path.basename(path)]
+        device = self._device(read_only=True)
+        device.verify()
+        # -- created 3, 1, 2 in 100CANON, then 4 in 101CANON
+        self.assertEqual(self._names(device), ['IMG_0003.JPG', 'IMG_0001.JPG', 'IMG_0002.JPG', 'IMG_0004.JPG'])
+
+    def test_physical_offset_unmapped(self):
+        path = os.path.join(self.folder, 'empty.jpg')
+        open(path, 'w').close()
+        self.assertIsNone(blockdevice.physical_offset(path))
+        self.assertIsNone(blockdevice.physical_offset(os.path.join(self.folder, 'missing.jpg')))
+
+if __name__ == '__main__':
+    unittest.main()
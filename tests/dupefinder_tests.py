@@ -0,0 +1,74 @@
+#!/usr/bin/python
+
+import os
+import errno
+import shutil
+import tempfile
+import unittest
+import dupefinder
+from dupefinder import DupeFinder, PARTIAL_SIZE
+
+class TestDupeFinder(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def _write(self, name, content):
+        path = os.path.join(self.folder, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+
+    def test_stages(self):
+        big = os.urandom(4*PARTIAL_SIZE)
+        # -- same size, head and tail as big, differs only in the middle
+        middle = big[:2*PARTIAL_SIZE] + bytes([big[2*PARTIAL_SIZE] ^ 1]) + big[2*PARTIAL_SIZE + 1:]
+        a = self._write('a/big.jpg', big)
+        b = self._write('b/big.jpg', big)
+        self._write('b/middle.jpg', middle)
+        small = os.urandom(100)
+        c = self._write('a/small.jpg', small)
+        d = self._write('c/small.jpg', small)
+        self._write('c/other.jpg', os.urandom(100))
+        self._write('c/unique.jpg', os.urandom(50))
+        finder = DupeFinder(workers=2)
+        groups = finder.find([self.folder])
+        self.assertEqual(groups, [[a, b], [c, d]])
+        self.assertEqual(finder.stats['files'], 7)
+        self.assertEqual(finder.stats['partial_hashed'], 6)
+        # -- the small files were settled by their partial digest
+        self.assertEqual(finder.stats['full_hashed'], 3)
+
+    def test_hardlinks_not_duplicates(self):
+        a = self._write('a.jpg', os.urandom(100))
+        os.link(a, os.path.join(self.folder, 'b.jpg'))
+        finder = DupeFinder()
+        self.assertEqual(finder.find([self.folder]), [])
+        self.assertEqual(finder.stats['hardlinks'], 1)
+
+    def test_folders_in_given_order(self):
+        content = os.urandom(100)
+        a = self._write('a/x.jpg', content)
+        b = self._write('b/x.jpg', content)
+        finder = DupeFinder()
+        self.assertEqual(finder.find([os.path.join(self.folder, 'b'), os.path.join(self.folder, 'a')]), [[b, a]])
+
+    def test_unreadable_file_dropped(self):
+        content = os.urandom(100)
+        paths = [ self._write('%s.jpg' % n, content) for n in range(3) ]
+        finder = DupeFinder()
+        partial_digest = finder._partial_digest
+        def vanishing(path, size):
+            if path == paths[1]:
+                raise OSError(errno.ENOENT, "No such file or directory")
+            return partial_digest(path, size)
+        finder._partial_digest = vanishing
+        self.assertEqual(finder.find([self.folder]), [[paths[0], paths[2]]])
+        self.assertEqual(finder.stats['unreadable'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+#!/usr/bin/python
+
+import os
+import struct
+import shutil
+import tempfile
+import unittest
+import exifheader
+from exifheader import read_header_tags
+
+def _tiff(order, ifd0, exif_ifd):
+    '''
+    A TIFF header, IFD0 (ASCII tags, plus a pointer to the EXIF IFD) and the EXIF IFD,
+    each {tag: str}, values longer than 4 bytes stored after the IFDs
+    '''
+    magic = b'II*\x00' if order == '<' else b'MM\x00*'
+    ifd0_offset = 8
+    ifd0_size = 2 + 12*(len(ifd0) + 1) + 4
+    exif_offset = ifd0_offset + ifd0_size
+    exif_size = 2 + 12*len(exif_ifd) + 4
+    values = b''
+    values_offset = exif_offset + exif_size
+
+    def entries(tags):
+        nonlocal values
+        packed = b''
+        for (tag, value,) in sorted(tags.items()):
+            data = value.encode('ascii') + b'\x00'
+            if len(data) <= 4:
+                field = data.ljust(4, b'\x00')
+            else:
+                field = struct.pack(order + 'I', values_offset + len(values))
+                values += data
+            packed += struct.pack(order + 'HHI', tag, exifheader.TYPE_ASCII, len(data)) + field
+        return packed
+
+    ifd0_entries = entries(ifd0) + struct.pack(order + 'HHII', exifheader.EXIF_OFFSET_TAG, 4, 1, exif_offset)
+    exif_entries = entries(exif_ifd)
+    return (magic + struct.pack(order + 'I', ifd0_offset)
+        + struct.pack(order + 'H', len(ifd0) + 1) + ifd0_entries + b'\x00'*4
+        + struct.pack(order + 'H', len(exif_ifd)) + exif_entries + b'\x00'*4
+        + values)
+
+def _jpeg(tiff, before=b''):
+    app1 = b'Exif\x00\x00' + tiff
+    return b'\xff\xd8' + before + b'\xff\xe1' + struct.pack('>H', len(app1) + 2) + app1 + b'\xff\xda' + bytes(100)
+
+IFD0 = { 0x010F: 'Canon', 0x0110: 'Canon EOS 5D', 0x0132: '2019:01:18 12:05:33' }
+EXIF_IFD = { 0x9003: '2019:01:18 12:05:30' }
+
+class TestExifHeader(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def _tags(self, content, **kwargs):
+        path = os.path.join(self.folder, 'image')
+        with open(path, 'wb') as f:
+            f.write(content)
+        return read_header_tags(path, **kwargs)
+
+    def _assert_all(self, tags):
+        self.assertEqual(str(tags['Image Make']), 'Canon')
+        self.assertEqual(str(tags['Image Model']), 'Canon EOS 5D')
+        self.assertEqual(str(tags['Image DateTime']), '2019:01:18 12:05:33')
+        self.assertEqual(str(tags['EXIF DateTimeOriginal']), '2019:01:18 12:05:30')
+
+    def test_jpeg_little_endian(self):
+        self._assert_all(self._tags(_jpeg(_tiff('<', IFD0, EXIF_IFD))))
+
+    def test_jpeg_big_endian_after_app0(self):
+        app0 = b'\xff\xe0' + struct.pack('>H', 16) + b'JFIF\x00' + bytes(9)
+        self._assert_all(self._tags(_jpeg(_tiff('>', IFD0, EXIF_IFD), before=app0)))
+
+    def test_tiff(self):
+        self._assert_all(self._tags(_tiff('<', IFD0, EXIF_IFD)))
+
+    def test_short_value_inline(self):
+        tags = self._tags(_jpeg(_tiff('<', { 0x010F: 'HP' }, {})))
+        self.assertEqual(str(tags['Image Make']), 'HP')
+
+    def test_jpeg_without_exif(self):
+        self.assertEqual(self._tags(b'\xff\xd8\xff\xda' + bytes(100)), {})
+
+    def test_not_read_here(self):
+        self.assertIsNone(self._tags(b'\x89PNG\r\n\x1a\n' + bytes(100)))
+
+    def test_truncated(self):
+        self.assertIsNone(self._tags(_jpeg(_tiff('<', IFD0, EXIF_IFD)), read_size=64))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+#!/usr/bin/python
+
+import os
+import shutil
+import tempfile
+import unittest
+import exifread
+import exifheader
+import exifwrapper
+from exifwrapper import ExifWrapper, VALUE_MAP_STOP_TAG
+from exifheader_tests import _tiff, _jpeg
+
+IFD0 = { 0x010F: 'Apple', 0x0110: 'iPhone 5', 0x0132: '2019:01:18 12:05:33' }
+EXIF_IFD = { 0x9003: '2019:01:18 12:05:30' }
+
+class CountingReaders(object):
+    '''
+    Counts header and exifread parses per path while in effect
+    '''
+
+    def __enter__(self):
+        self.header_reads = []
+        self.exifread_reads = []
+        self.read_header_tags = exifheader.read_header_tags
+        self.process_file = exifread.process_file
+        def read_header_tags(path, *args, **kwargs):
+            self.header_reads.append(path)
+            return self.read_header_tags(path, *args, **kwargs)
+        def process_file(f, *args, **kwargs):
+            self.exifread_reads.append((f.name, kwargs.get('stop_tag'),))
+            return self.process_file(f, *args, **kwargs)
+        exifheader.read_header_tags = read_header_tags
+        exifread.process_file = process_file
+        return self
+
+    def __exit__(self, *args):
+        exifheader.read_header_tags = self.read_header_tags
+        exifread.process_file = self.process_file
+
+class TestExifWrapper(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def _file(self, name, content):
+        path = os.path.join(self.folder, name)
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+
+    def test_parsed_once_for_date_and_descriptive(self):
+        path = self._file('IMG_0001.JPG', _jpeg(_tiff('<', IFD0, EXIF_IFD)))
+        with CountingReaders() as readers:
+            wrapper = ExifWrapper(filepath=path, value_map_only=True)
+            image_datetime = wrapper.image_datetime()
+            all_values = wrapper.all_values()
+            wrapper.image_datetime()
+        self.assertEqual(readers.header_reads, [path])
+        self.assertEqual(readers.exifread_reads, [])
+        self.assertEqual(str(all_values['image_make']), 'Apple')
+        self.assertEqual(all_values['image_datetime'], image_datetime)
+        self.assertEqual(image_datetime.strftime("%Y-%m-%d %H:%M:%S"), "2019-01-18 12:05:33")
+
+    def test_other_formats_stop_at_value_map_tags(self):
+        path = self._file('IMG_0001.PNG', b'\x89PNG\r\n\x1a\n' + bytes(100))
+        with CountingReaders() as readers:
+            wrapper = ExifWrapper(filepath=path, value_map_only=True)
+            self.assertIsNone(wrapper.image_datetime())
+            self.assertEqual(wrapper.all_values(), {})
+        self.assertEqual(readers.exifread_reads, [(path, VALUE_MAP_STOP_TAG,)])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+#!/usr/bin/python
+
+import os
+import shutil
+import hashlib
+import tempfile
+import unittest
+from hashindex import HashIndex
+
+class TestHashIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, 'a.jpg')
+        self._write(self.path, b'first')
+        self.hashed = []
+        self.index = HashIndex(dbpath=os.path.join(self.folder, 'hashindex.db'), hash_method=self._md5)
+
+    def tearDown(self):
+        self.index.close()
+        shutil.rmtree(self.folder)
+
+    def _write(self, path, content, mtime=1500000000):
+        with open(path, 'wb') as f:
+            f.write(content)
+        os.utime(path, (mtime, mtime))
+
+    def _md5(self, path):
+        self.hashed.append(path)
+        with open(path, 'rb') as f:
+            return hashlib.md5(f.read()).hexdigest()
+
+    def test_digest_hashed_once(self):
+        self.assertEqual(self.index.digest(self.path), hashlib.md5(b'first').hexdigest())
+        self.assertEqual(self.index.digest(self.path), hashlib.md5(b'first').hexdigest())
+        self.assertEqual(self.hashed, [self.path])
+
+    def test_size_change_rehashed(self):
+        self.index.digest(self.path)
+        self._write(self.path, b'second')
+        self.assertIsNone(self.index.lookup(self.path))
+        self.assertEqual(self.index.digest(self.path), hashlib.md5(b'second').hexdigest())
+        self.assertEqual(self.hashed, [self.path, self.path])
+
+    def test_mtime_change_rehashed(self):
+        self.index.digest(self.path)
+        # -- same size, same inode, rewritten later
+        self._write(self.path, b'firsT', mtime=1600000000)
+        self.assertIsNone(self.index.lookup(self.path))
+        self.assertEqual(self.index.digest(self.path), hashlib.md5(b'firsT').hexdigest())
+        self.assertEqual(len(self.hashed), 2)
+
+    def test_kept_across_reopen(self):
+        self.index.record(self.path, digest='known')
+        self.index.close()
+        self.index = HashIndex(dbpath=os.path.join(self.folder, 'hashindex.db'), hash_method=self._md5)
+        self.assertEqual(self.index.digest(self.path), 'known')
+        self.assertEqual(self.hashed, [])
+
+    def test_upsert_keeps_other_hash_of_unchanged_file(self):
+        self.index.record(self.path, digest='known')
+        self.index.record_perceptual(self.path, (1 << 64) - 1)
+        self.assertEqual(self.index.lookup(self.path), 'known')
+        self.assertEqual(self.index.perceptual(self.path), (1 << 64) - 1)
+        # -- recording the digest again leaves the perceptual hash
+        self.index.record(self.path, digest='known')
+        self.assertEqual(self.index.perceptual(self.path), (1 << 64) - 1)
+
+    def test_upsert_drops_other_hash_of_changed_file(self):
+        self.index.record(self.path, digest='known')
+        self._write(self.path, b'second')
+        self.index.record_perceptual(self.path, 5)
+        self.assertEqual(self.index.perceptual(self.path), 5)
+        self.assertIsNone(self.index.lookup(self.path))
+        self.assertEqual(list(self.index.perceptual_hashes()), [(self.path, 5,)])
+
+    def test_record_without_digest_hashed_on_lookup(self):
+        self.index.record(self.path)
+        self.assertIsNone(self.index.lookup(self.path))
+        self.assertEqual(self.index.digest(self.path), hashlib.md5(b'first').hexdigest())
+
+    def test_forget(self):
+        self.index.record(self.path, digest='known')
+        self.index.forget(self.path)
+        self.assertIsNone(self.index.lookup(self.path))
+        self.assertEqual(self.index.paths_for_digest('known'), [])
+
+    def test_paths_for_digest(self):
+        other = os.path.join(self.folder, 'b.jpg')
+        self._write(other, b'first')
+        self.index.record(self.path, digest='known')
+        self.index.record(other, digest='known')
+        self.assertEqual(sorted(self.index.paths_for_digest('known', size=5)), [self.path, other])
+        self.assertEqual(self.index.paths_for_digest('known', size=6), [])
+        # -- changed since indexed, or gone
+        self._write(other, b'second')
+        os.remove(self.path)
+        self.assertEqual(self.index.paths_for_digest('known'), [])
+
+if __name__ == '__main__':
+    unittest.main()
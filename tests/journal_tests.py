@@ -0,0 +1,54 @@
+#!/usr/bin/python
+
+import os
+import shutil
+import tempfile
+import unittest
+from journal import SessionJournal
+
+class TestSessionJournal(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, 'photobinner_20190118_120533_test.out.journal')
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_replay_in_order(self):
+        journal = SessionJournal(path=self.path)
+        journal.append('processed', source='Card', path='/a.jpg')
+        journal.append('stat', flush=False, type='anomalies', key='no-exif', path='/b.jpg')
+        journal.append('processed', source='Card', path='/b.jpg')
+        journal.close()
+        self.assertEqual([ (r['kind'], r['path'],) for r in SessionJournal(path=self.path).replay() ], [('processed', '/a.jpg',), ('stat', '/b.jpg',), ('processed', '/b.jpg',)])
+
+    def test_resume_after_partial_line(self):
+        journal = SessionJournal(path=self.path)
+        journal.append('processed', source='Card', path='/a.jpg')
+        journal.close()
+        # -- a run killed mid-write
+        with open(self.path, 'a') as f:
+            f.write('{"kind": "processed", "sou')
+        self.assertEqual([ r['path'] for r in SessionJournal(path=self.path).replay() ], ['/a.jpg'])
+
+    def test_replay_missing(self):
+        self.assertEqual(list(SessionJournal(path=self.path).replay()), [])
+
+    def test_details(self):
+        journal = SessionJournal(path=self.path)
+        journal.append('stat', type='anomalies', key='no-exif', path='/a.jpg')
+        journal.append('moves', folder='/card', target='/pics/2019/2019-01-18', path='/card/a.jpg')
+        journal.append('correct', folder='/pics/2019', target=None, path='/pics/2019/b.jpg')
+        journal.append('transfer', dest='/pics/2019/2019-01-18/a.jpg', method='reflink', bytes=10)
+        journal.append('near-duplicate', path='/card/c.jpg', matches=[{ 'path': '/card/a.jpg', 'distance': 3 }])
+        journal.close()
+        details = journal.details()
+        self.assertEqual(details['anomalies'], { 'no-exif': ['/a.jpg'] })
+        self.assertEqual(details['moves'], { '/card': { '/pics/2019/2019-01-18': ['/card/a.jpg'] } })
+        self.assertEqual(details['correct'], { '/pics/2019': ['/pics/2019/b.jpg'] })
+        self.assertEqual(details['transfers']['/pics/2019/2019-01-18/a.jpg']['method'], 'reflink')
+        self.assertEqual(details['near_duplicates']['/card/c.jpg'][0]['distance'], 3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+#!/usr/bin/python
+
+import logging
+import unittest
+from logescrow import LogEscrow, ESCROW_LIMIT
+
+class Captured(logging.Handler):
+
+    def __init__(self):
+        logging.Handler.__init__(self)
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage().strip())
+
+class TestLogEscrow(unittest.TestCase):
+
+    def setUp(self):
+        self.logger = logging.getLogger('logescrow_tests')
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+        self.captured = Captured()
+        self.logger.addHandler(self.captured)
+        self.escrow = LogEscrow(name='logescrow_tests')
+        self.formatted = []
+
+    def tearDown(self):
+        self.logger.removeHandler(self.captured)
+
+    def _statement(self, text):
+        def build():
+            self.formatted.append(text)
+            return text
+        return build
+
+    def _assert_empty(self):
+        self.assertEqual((self.escrow.held, self.escrow.log_escrow, self.escrow.level_escrow,), (0, {}, {},))
+
+    def test_formatted_only_when_logged(self):
+        self.escrow.debug(self._statement('below level'))
+        self.escrow.debug(self._statement('below level, held'), event='move')
+        self.escrow.info(self._statement('held'), event='move')
+        self.escrow.info("%s %s", 'with', 'args', event='move')
+        self.assertEqual(self.formatted, [])
+        self.escrow.clear_log_escrow()
+        self.assertEqual(self.formatted, [])
+        self.assertEqual(self.captured.messages, [])
+
+    def test_trigger_release(self):
+        self.escrow.info("first", event='move')
+        self.escrow.warn("second", event='other')
+        self.escrow.info("third %s", 3, event='move')
+        self.escrow.release_log_escrow(trigger='move')
+        self.assertEqual(self.captured.messages, ['first', 'third 3'])
+        # -- released records are gone from the level index too, a level release only finds the rest
+        self.assertEqual([ list(records) for records in self.escrow.level_escrow.values() ], [[1]])
+        self.escrow.release_log_escrow(level=logging.ERROR)
+        self.assertEqual(self.captured.messages, ['first', 'third 3', 'second'])
+        self._assert_empty()
+
+    def test_level_release_in_order(self):
+        self.escrow.warn("first", event='a')
+        self.escrow.info("second", event='b')
+        self.escrow.error("third", event='a')
+        self.escrow.info("fourth", event='b')
+        # -- a statement logged now releases what's held at or below its level first
+        self.escrow.warn("now")
+        self.assertEqual(self.captured.messages, ['first', 'second', 'fourth', 'now'])
+        self.escrow.release_log_escrow(trigger='b')
+        self.assertEqual(self.captured.messages, ['first', 'second', 'fourth', 'now'])
+        self.escrow.release_log_escrow(trigger='a')
+        self.assertEqual(self.captured.messages, ['first', 'second', 'fourth', 'now', 'third'])
+        self._assert_empty()
+
+    def test_bounded(self):
+        for n in range(ESCROW_LIMIT + 5):
+            self.escrow.info(self._statement("statement %s" % n), event='move')
+        self.escrow.warn("other", event='other')
+        self.assertEqual(self.escrow.held, ESCROW_LIMIT + 1)
+        self.assertEqual(len(self.escrow.level_escrow[logging.INFO]), ESCROW_LIMIT)
+        self.escrow.release_log_escrow(trigger='move')
+        self.assertEqual(self.captured.messages, [ "statement %s" % n for n in range(5, ESCROW_LIMIT + 5) ])
+        # -- the dropped statements were never built
+        self.assertEqual(self.formatted, self.captured.messages)
+        self.escrow.release_log_escrow(trigger='other')
+        self._assert_empty()
+
+if __name__ == '__main__':
+    unittest.main()
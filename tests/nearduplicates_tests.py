@@ -0,0 +1,80 @@
+#!/usr/bin/python
+
+import os
+import random
+import shutil
+import tempfile
+import unittest
+import nearduplicates
+from nearduplicates import MultiIndex, distance
+
+class TestMultiIndex(unittest.TestCase):
+
+    def test_finds_everything_within_radius(self):
+        generator = random.Random(18)
+        for radius in [0, 1, 4, 6, 10]:
+            index = MultiIndex(radius)
+            hashes = [ generator.getrandbits(64) for n in range(200) ]
+            # -- and some close to others
+            for n in range(200):
+                h = hashes[n]
+                for b in generator.sample(range(64), generator.randint(1, radius + 2)):
+                    h ^= 1 << b
+                hashes.append(h)
+            for (n, h,) in enumerate(hashes):
+                index.add(h, n)
+            for query in hashes[:50] + [ generator.getrandbits(64) for n in range(20) ]:
+                expected = sorted([ (distance(query, h), n,) for (n, h,) in enumerate(hashes) if distance(query, h) <= radius ])
+                self.assertEqual(sorted(index.search(query)), expected)
+
+    def test_closest_first(self):
+        index = MultiIndex(6)
+        index.add(0b111, 'three')
+        index.add(0b1, 'one')
+        self.assertEqual(index.search(0), [(1, 'one',), (3, 'three',)])
+
+    def test_item_added_again(self):
+        index = MultiIndex(4)
+        index.add(0xFF, 'a.jpg')
+        index.add(0xFF, 'a.jpg')
+        self.assertEqual(index.search(0xFF), [(0, 'a.jpg',)])
+
+    def test_distance(self):
+        self.assertEqual(distance(0, 0), 0)
+        self.assertEqual(distance(0b1011, 0b0001), 2)
+        self.assertEqual(distance(0, (1 << 64) - 1), 64)
+
+@unittest.skipUnless(nearduplicates.available(), "needs numpy and Pillow")
+class TestDHash(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def _image(self, name, pattern, quality=95):
+        image = nearduplicates.Image.new('L', (320, 240))
+        image.putdata([ pattern(x, y) % 256 for y in range(240) for x in range(320) ])
+        path = os.path.join(self.folder, name)
+        image.save(path, quality=quality)
+        return path
+
+    def test_reencoded_is_near(self):
+        gradient = lambda x, y: x*2 + (y//40)*37
+        (a, b, other,) = nearduplicates.dhash_batch([
+            nearduplicates.thumbnail(self._image('a.jpg', gradient)),
+            nearduplicates.thumbnail(self._image('b.jpg', gradient, quality=30)),
+            nearduplicates.thumbnail(self._image('other.jpg', lambda x, y: (320 - x)*2 + (y//30)*53))
+        ])
+        self.assertLessEqual(distance(a, b), 4)
+        self.assertGreater(distance(a, other), 10)
+
+    def test_undecodable(self):
+        path = os.path.join(self.folder, 'broken.jpg')
+        with open(path, 'wb') as f:
+            f.write(b'\xff\xd8 not really')
+        self.assertIsNone(nearduplicates.thumbnail(path))
+
+if __name__ == '__main__':
+    unittest.main()
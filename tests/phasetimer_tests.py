@@ -0,0 +1,50 @@
+#!/usr/bin/python
+
+import unittest
+import phasetimer
+from phasetimer import PhaseTimer
+
+class TestPhaseTimer(unittest.TestCase):
+
+    def test_counts_and_totals(self):
+        timer = PhaseTimer()
+        for n in range(1, 101):
+            timer.record('hash', n/1000.0, size=10)
+        summary = timer.summary()['hash']
+        self.assertEqual(summary['calls'], 100)
+        self.assertAlmostEqual(summary['seconds'], 5.05)
+        self.assertAlmostEqual(summary['mean_ms'], 50.5)
+        self.assertAlmostEqual(summary['max_ms'], 100.0)
+        self.assertEqual(summary['bytes'], 1000)
+
+    def test_percentiles_within_bucket_error(self):
+        timer = PhaseTimer()
+        for n in range(1, 1001):
+            timer.record('file', n/10000.0)
+        summary = timer.summary()['file']
+        # -- nearest rank of 0.1ms..100ms in 0.1ms steps
+        for (p, expected_ms,) in [(50, 50.1), (90, 90.1), (99, 99.1)]:
+            self.assertAlmostEqual(summary['p%s_ms' % p], expected_ms, delta=expected_ms*0.05)
+
+    def test_memory_fixed(self):
+        timer = PhaseTimer()
+        for n in range(10000):
+            timer.record('source', 0.001*(n % 7))
+        self.assertEqual(len(timer.phases['source']['buckets']), phasetimer.BUCKET_COUNT)
+        self.assertEqual(timer.summary()['source']['calls'], 10000)
+
+    def test_single_call(self):
+        timer = PhaseTimer()
+        with timer.phase('transfer', 5):
+            pass
+        summary = timer.summary()['transfer']
+        self.assertEqual(summary['p99_ms'], summary['max_ms'])
+
+    def test_timed_iter(self):
+        timer = PhaseTimer()
+        self.assertEqual(list(timer.timed_iter('source', range(3))), [0, 1, 2])
+        # -- and the wait for the end
+        self.assertEqual(timer.summary()['source']['calls'], 4)
+
+if __name__ == '__main__':
+    unittest.main()
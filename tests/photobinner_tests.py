@@ -0,0 +1,309 @@
+#!/usr/bin/python
+
+import os
+import time
+import types
+import shutil
+import tempfile
+import threading
+import unittest
+from importlib.machinery import SourceFileLoader
+from logescrow import LogEscrow
+from datetime import datetime
+from sources.source import SourceFile
+from sources.android import Android
+from android_tests import FakeDevice, SEARCH_PATH
+from exifheader_tests import _tiff, _jpeg
+from exifwrapper_tests import CountingReaders, IFD0, EXIF_IFD
+
+PHOTOBINNER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'photobinner', 'photobinner')
+
+PBRC = '''[DEFAULT]
+target = %(home)s/target
+
+[folders]
+exact_matches = %(home)s/exact_matches
+copy_exact_matches = False
+
+[locale]
+timezone = US/Eastern
+
+[Source-Test]
+type = Folder
+mountpoint = %(home)s/source
+transfer_method = copy
+'''
+
+home = None
+original_home = None
+pb_module = None
+
+def setUpModule():
+    '''
+    The photobinner script has no .py extension and reads ~/.pbrc on import
+    '''
+    global home, original_home, pb_module
+    home = tempfile.mkdtemp()
+    original_home = os.environ.get('HOME')
+    os.environ['HOME'] = home
+    os.makedirs(os.path.join(home, '.pbrc'))
+    os.makedirs(os.path.join(home, 'source'))
+    with open(os.path.join(home, '.pbrc', 'config'), 'w') as f:
+        f.write(PBRC % { 'home': home })
+    loader = SourceFileLoader('photobinner_script', PHOTOBINNER_SCRIPT)
+    pb_module = types.ModuleType(loader.name)
+    loader.exec_module(pb_module)
+
+def tearDownModule():
+    if original_home is not None:
+        os.environ['HOME'] = original_home
+    shutil.rmtree(home)
+
+def _write(path, content, mtime=1500000000):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(content)
+    os.utime(path, (mtime, mtime))
+
+class PhotoBinnerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        for folder in ['source', 'target', 'exact_matches', os.path.join('.pbrc', 'stats')]:
+            shutil.rmtree(os.path.join(home, folder), ignore_errors=True)
+        self.source = os.path.join(home, 'source')
+        self.target = pb_module.DEFAULT_TARGET
+        # -- a source needs a file to be verified
+        _write(os.path.join(self.source, 'IMG_20170714_022640.jpg'), b'first')
+        # -- constructed but not run, so not closed
+        self.photobinners = []
+
+    def tearDown(self):
+        for pb in self.photobinners:
+            pb.hash_index.close()
+            if pb.journal:
+                pb.journal.close()
+
+    def _photobinner(self, **kwargs):
+        options = {
+            'target_base_folder': pb_module.DEFAULT_TARGET,
+            'exact_matches_folder': pb_module.EXACT_MATCHES_FOLDER,
+            'session_choice': 'n',
+            'session_name': 'test'
+        }
+        options.update(kwargs)
+        pb = pb_module.PhotoBinner(**options)
+        self.photobinners.append(pb)
+        return pb
+
+    def _run(self, pb):
+        self.photobinners.remove(pb)
+        pb.run()
+
+class TestConcurrentDecisions(PhotoBinnerTestCase):
+
+    def test_in_flight_target_waited_on_outside_lock(self):
+        pb = self._photobinner()
+        target_folder = os.path.join(self.target, '2017', '2017-07-14')
+        target_path = os.path.join(target_folder, 'IMG_20170714_022640.jpg')
+        # -- another source is still transferring to the path this file decides on
+        with pb.target_lock:
+            pb._claim_target(target_folder, target_path)
+        decided = []
+        def decide():
+            pb.log_escrow = LogEscrow(name=__name__)
+            decided.append(pb._decide_move(SourceFile(os.path.join(self.source, 'IMG_20170714_022640.jpg')), target_folder, 'IMG_20170714_022640.jpg'))
+        decider = threading.Thread(target=decide, daemon=True)
+        decider.start()
+        time.sleep(0.2)
+        # -- the decision waits, but not holding target_lock
+        self.assertTrue(pb.target_lock.acquire(timeout=5))
+        pb.target_lock.release()
+        self.assertEqual(decided, [])
+        _write(target_path, b'first')
+        pb._settle_target(target_path)
+        decider.join(5)
+        # -- decided again once settled: the same content is already there
+        self.assertEqual(decided, [(target_folder, False,)])
+
+    def test_files_hashed_outside_lock(self):
+        pb = self._photobinner()
+        target_folder = os.path.join(self.target, '2017', '2017-07-14')
+        # -- same name and size at the target, so deciding means hashing both files
+        _write(os.path.join(target_folder, 'IMG_20170714_022640.jpg'), b'other')
+        hashing = threading.Event()
+        hashed = threading.Event()
+        md5 = pb._md5
+        def slow_md5(path):
+            hashing.set()
+            hashed.wait(5)
+            return md5(path)
+        pb._md5 = slow_md5
+        pb.hash_index.hash_method = slow_md5
+        decided = []
+        def decide():
+            pb.log_escrow = LogEscrow(name=__name__)
+            decided.append(pb._decide_move(SourceFile(os.path.join(self.source, 'IMG_20170714_022640.jpg')), target_folder, 'IMG_20170714_022640.jpg'))
+        decider = threading.Thread(target=decide, daemon=True)
+        decider.start()
+        self.assertTrue(hashing.wait(5))
+        self.assertTrue(pb.target_lock.acquire(timeout=5))
+        pb.target_lock.release()
+        hashed.set()
+        decider.join(5)
+        # -- different content: a dupe slot, claimed
+        dupe_folder = os.path.join(target_folder, 'dupe', '0')
+        self.assertEqual(decided, [(dupe_folder, True,)])
+        self.assertIn(os.path.join(dupe_folder, 'IMG_20170714_022640.jpg'), pb.claimed_targets)
+
+    def test_variant_waits_for_claim(self):
+        pb = self._photobinner()
+        variant = os.path.join(self.source, 'IMG_20170714_022640.jpg.xmp')
+        _write(variant, b'<xmp/>')
+        new_path = os.path.join(self.target, '2017', '2017-07-14', 'IMG_20170714_022640.jpg.xmp')
+        with pb.target_lock:
+            pb._claim_target(os.path.dirname(new_path), new_path)
+        transferrer = threading.Thread(target=pb._transfer_variant, args=(pb.verified_sources['Test'], variant, new_path,), daemon=True)
+        transferrer.start()
+        time.sleep(0.2)
+        self.assertFalse(os.path.exists(new_path))
+        pb._settle_target(new_path)
+        transferrer.join(5)
+        self.assertTrue(os.path.exists(new_path))
+        self.assertNotIn(new_path, pb.claimed_targets)
+
+    def test_dry_run_plans_each_target_once(self):
+        pb = self._photobinner(dry_run=True)
+        target_folder = os.path.join(self.target, '2017', '2017-07-14')
+        filename = 'IMG_20170714_022640.jpg'
+        _write(os.path.join(self.source, 'a', filename), b'other')
+        _write(os.path.join(self.source, 'b', filename), b'first')
+        decided = []
+        for folder in ['', 'a', 'b']:
+            pb.source_digests = {}
+            decided.append(pb._decide_move(SourceFile(os.path.join(self.source, folder, filename)), target_folder, filename))
+        self.assertFalse(os.path.exists(self.target))
+        # -- the second is different content, the third the same as the first
+        self.assertEqual(decided, [(target_folder, True,), (os.path.join(target_folder, 'dupe', '0'), True,), (target_folder, False,)])
+
+def _tree(folder):
+    '''
+    Relative path -> content of every file under folder
+    '''
+    tree = {}
+    for (current_folder, folders, files,) in os.walk(folder):
+        for name in files:
+            with open(os.path.join(current_folder, name), 'rb') as f:
+                tree[os.path.relpath(os.path.join(current_folder, name), folder)] = f.read()
+    return tree
+
+class TestSessions(PhotoBinnerTestCase):
+
+    def setUp(self):
+        PhotoBinnerTestCase.setUp(self)
+        _write(os.path.join(self.source, 'IMG_20170714_030000.jpg'), b'second')
+        _write(os.path.join(self.source, 'trip', 'IMG_20180102_101010.jpg'), b'third')
+        # -- same name and date as the first, different content (and no descriptive text): filed as a dupe
+        _write(os.path.join(self.source, '2017', 'IMG_20170714_022640.jpg'), b'other')
+
+    def test_plan_then_apply_as_a_real_run(self):
+        self._run(self._photobinner(session_choice='s'))
+        expected = _tree(self.target)
+        self.assertEqual(len(expected), 4)
+        self.assertIn(os.path.join('2017', '2017-07-14', 'dupe', '0', 'IMG_20170714_022640.jpg'), expected)
+        shutil.rmtree(self.target)
+
+        planning = self._photobinner(dry_run=True, session_name='plan')
+        self._run(planning)
+        self.assertFalse(os.path.exists(self.target))
+        self._run(self._photobinner(apply_plan=planning.plan.path, session_name='apply'))
+        self.assertEqual(_tree(self.target), expected)
+
+    def test_resume_from_journal(self):
+        killed = self._photobinner(session_name='resume')
+        first = os.path.join(self.source, 'IMG_20170714_022640.jpg')
+        # -- a run that processed one file, then died before writing the session file
+        killed._mark_processed('Test', killed.verified_sources['Test'], first)
+        killed.journal.close()
+        killed.hash_index.close()
+        self.photobinners.remove(killed)
+        resumed = self._photobinner(session_choice='1')
+        self.assertEqual(resumed.sessionfile, killed.sessionfile)
+        self.assertEqual(resumed.verified_sources['Test'].processed_files, set([first]))
+        self._run(resumed)
+        self.assertEqual(sorted(_tree(self.target).values()), [b'other', b'second', b'third'])
+
+class TestMetadata(PhotoBinnerTestCase):
+
+    def setUp(self):
+        PhotoBinnerTestCase.setUp(self)
+        # -- an Apple make and model, so the descriptive step reads the metadata too
+        _write(os.path.join(self.source, 'IMG_0001.JPG'), _jpeg(_tiff('<', IFD0, EXIF_IFD)))
+        _write(os.path.join(self.source, 'trip', 'IMG_0002.JPG'), _jpeg(_tiff('>', IFD0, EXIF_IFD)))
+
+    def _assert_parsed_once(self, **kwargs):
+        with CountingReaders() as readers:
+            self._run(self._photobinner(**kwargs))
+        self.assertEqual(len(_tree(self.target)), 3)
+        # -- every file read by the header reader once, exifread only for the one it can't read
+        self.assertEqual(sorted(readers.header_reads), sorted(set(readers.header_reads)))
+        self.assertEqual(len(readers.header_reads), 3)
+        self.assertEqual([ os.path.basename(path) for (path, stop_tag,) in readers.exifread_reads ], ['IMG_20170714_022640.jpg'])
+
+    def test_parsed_once_per_file(self):
+        self._assert_parsed_once()
+
+    def test_parsed_once_per_file_reading_ahead(self):
+        self._assert_parsed_once(workers=2)
+
+class TestPrepull(PhotoBinnerTestCase):
+
+    def _epoch(self, *date):
+        return (pb_module.TZ.localize(datetime(*date)) - pb_module.LOCAL_EPOCH).total_seconds()
+
+    def test_imported_files_not_pulled(self):
+        pb = self._photobinner()
+        # -- imported by a full run: dated from EXIF, seconds before the device wrote the file
+        imported = self._epoch(2017, 7, 14, 2, 26, 40)
+        _write(os.path.join(self.target, '2017', '2017-07-14', 'IMG_20170714_022640.jpg'), b'first', mtime=imported)
+        # -- same name and size, but another capture
+        _write(os.path.join(self.target, '2017', '2017-07-15', 'IMG_20170715_101010.jpg'), b'other', mtime=self._epoch(2017, 7, 15, 9, 0, 0))
+        files = {
+            "%s/IMG_20170714_022640.jpg" % SEARCH_PATH: b'first',
+            "%s/IMG_20170715_101010.jpg" % SEARCH_PATH: b'fresh',
+            "%s/IMG_20170716_080000.jpg" % SEARCH_PATH: b'new'
+        }
+        device_mtimes = { f: int(self._epoch(2017, 7, 14 + n, 2, 26, 40)) + 3 for (n, f,) in enumerate(sorted(files)) }
+        android = Android(search_paths=[SEARCH_PATH], prepull_check='true', processed_files=set(), target=self.target, exclude_descriptive=[])
+        android.device = FakeDevice(files)
+        android.files = { SEARCH_PATH: sorted(files) }
+        android.file_stats = { f: (len(files[f]), device_mtimes[f],) for f in files }
+        android.skip_check = lambda sf, device_digest=None: pb._prepull_match('Phone', android, sf, device_digest)
+        pulled = []
+        for sourcefile in android.paths():
+            pulled.append(sourcefile.original_path)
+            # -- staged with the device's mtime, as a full run would date it
+            self.assertEqual(os.path.getmtime(sourcefile.working_path), device_mtimes[sourcefile.original_path])
+            sourcefile.release()
+        self.assertEqual(pulled, sorted(files)[1:])
+        self.assertEqual(android.processed_files, set([sorted(files)[0]]))
+
+class TestCaches(PhotoBinnerTestCase):
+
+    def test_caches_per_instance(self):
+        first = self._photobinner()
+        first.log_escrow = LogEscrow(name=__name__)
+        sourcefile = SourceFile(os.path.join(self.source, 'trip_2017_07_14', 'IMG_0001.JPG'))
+        _write(sourcefile.original_path, b'first')
+        self.assertEqual(first._extract_date_from_path(sourcefile).day, 14)
+        self.assertEqual(first._extract_descriptive(sourcefile, self.source, None), 'trip')
+        second = self._photobinner()
+        self.assertEqual((second.path_date_cache, second.descriptive_cache, second.descriptive_remove_patterns,), ({}, {}, {},))
+
+class TestSourceConfig(PhotoBinnerTestCase):
+
+    def test_read_only_unless_moved(self):
+        # -- the test source copies, so a block device configured the same way is mounted read-only
+        self.assertTrue(self._photobinner().verified_sources['Test'].read_only)
+
+if __name__ == '__main__':
+    unittest.main()
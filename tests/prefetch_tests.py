@@ -0,0 +1,69 @@
+#!/usr/bin/python
+
+import time
+import threading
+import unittest
+from concurrent.futures import Future, ThreadPoolExecutor
+from prefetch import ordered_prefetch
+
+class InlineExecutor(object):
+    '''
+    Runs each submitted call before returning its (done) future
+    '''
+
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+class TestOrderedPrefetch(unittest.TestCase):
+
+    def test_order_kept(self):
+        prepared = []
+        def prepare(n):
+            # -- later items finish first
+            time.sleep((10 - n)*0.002)
+            prepared.append(n)
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            self.assertEqual(list(ordered_prefetch(range(10), prepare, executor, 4)), list(range(10)))
+        self.assertEqual(sorted(prepared), list(range(10)))
+
+    def test_short_input(self):
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            self.assertEqual(list(ordered_prefetch([1, 2, 3], lambda n: None, executor, 8)), [1, 2, 3])
+
+    def test_ready_head_not_held_for_window(self):
+        pulled = []
+        def items():
+            for n in range(20):
+                pulled.append(n)
+                yield n
+        prefetched = ordered_prefetch(items(), lambda n: None, InlineExecutor(), 8)
+        self.assertEqual(next(prefetched), 0)
+        self.assertEqual(pulled, [0])
+        prefetched.close()
+
+    def test_discard_on_early_close(self):
+        pulled = []
+        def items():
+            for n in range(10):
+                pulled.append(n)
+                yield n
+        release = threading.Event()
+        def prepare(n):
+            # -- the head is still being prepared when the window fills
+            if n == 0:
+                time.sleep(0.1)
+            else:
+                release.wait(5)
+        discarded = []
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            prefetched = ordered_prefetch(items(), prepare, executor, 4, discard=discarded.append)
+            self.assertEqual(next(prefetched), 0)
+            release.set()
+            prefetched.close()
+        self.assertEqual(pulled, [0, 1, 2, 3])
+        self.assertEqual(sorted(discarded), [1, 2, 3])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+#!/usr/bin/python
+
+import os
+import json
+import shutil
+import tempfile
+import unittest
+from sessioncatalog import SessionCatalog, CATALOG_FILENAME
+
+class TestSessionCatalog(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.sessionfile = os.path.join(self.folder, 'photobinner_20190118_120533_test.out')
+        self._write_session('open')
+        self.loaded = []
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def _write_session(self, status, mtime=1500000000):
+        with open(self.sessionfile, 'w') as f:
+            json.dump({ 'meta': { 'status': status, 'dry_run': 'false' } }, f)
+        os.utime(self.sessionfile, (mtime, mtime))
+
+    def _loader(self, sessionfile):
+        self.loaded.append(sessionfile)
+        with open(sessionfile) as f:
+            return json.load(f)
+
+    def test_header_parsed_once(self):
+        catalog = SessionCatalog(folder=self.folder)
+        self.assertEqual(catalog.header(self.sessionfile, self._loader)['status'], 'open')
+        catalog.save()
+        catalog = SessionCatalog(folder=self.folder)
+        self.assertEqual(catalog.header(self.sessionfile, self._loader)['status'], 'open')
+        self.assertEqual(self.loaded, [self.sessionfile])
+
+    def test_changed_session_parsed_again(self):
+        catalog = SessionCatalog(folder=self.folder)
+        catalog.header(self.sessionfile, self._loader)
+        self._write_session('closed', mtime=1600000000)
+        self.assertEqual(catalog.header(self.sessionfile, self._loader)['status'], 'closed')
+        self.assertEqual(len(self.loaded), 2)
+
+    def test_removed_sessions_forgotten(self):
+        catalog = SessionCatalog(folder=self.folder)
+        catalog.header(self.sessionfile, self._loader)
+        os.remove(self.sessionfile)
+        catalog.save()
+        self.assertEqual(SessionCatalog(folder=self.folder).entries, {})
+
+    def test_unreadable_catalog_rebuilt(self):
+        with open(os.path.join(self.folder, CATALOG_FILENAME), 'w') as f:
+            f.write('{"photobinner_')
+        catalog = SessionCatalog(folder=self.folder)
+        self.assertEqual(catalog.header(self.sessionfile, self._loader)['status'], 'open')
+
+if __name__ == '__main__':
+    unittest.main()
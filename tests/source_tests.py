@@ -0,0 +1,142 @@
+#!/usr/bin/python
+
+import os
+import re
+import shutil
+import tempfile
+import unittest
+import sources.source
+from sources.folder import Folder
+from sources.source import StitchFolder
+
+def _os_walk_paths(source):
+    '''
+    The os.walk walker _walk replaced, as it was meant to work: excludes and stitch folders
+    taken by their full path. Returns the files (with their stat) and the stitch folders.
+    '''
+    files = []
+    stitch_folders = []
+    for (current_folder, dirnames, filenames) in os.walk(source.mountpoint, topdown=True):
+        stitch_folders.extend([ os.path.join(current_folder, d) for d in dirnames if re.search(source.stitch_folder_match, d) ])
+        dirnames[:] = [ d for d in dirnames if os.path.abspath(os.path.join(current_folder, d)) not in sources.source.FIX_EXCLUDE_PATHS and not re.search(source.stitch_folder_match, d) ]
+        for filename in source._filter(filenames):
+            filepath = os.path.join(current_folder, filename)
+            if filepath not in source.processed_files:
+                files.append((filepath, os.stat(filepath),))
+    return (files, stitch_folders,)
+
+class TestWalk(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        for path in [
+                'a.jpg', 'notes.txt', '._a.jpg', 'b.MOV',
+                '2019/album/c.jpg', '2019/album/d.cr2', '2019/album/deeper/e.png',
+                '2019/STITCH_0001/STA_0001.JPG', '2019/STITCH_0001/STB_0001.JPG',
+                'excluded/f.jpg', 'excluded/inner/g.jpg',
+                'z/h.mp4', 'z/STITCH_0002/STA_0002.JPG']:
+            self._touch(os.path.join(self.folder, path))
+        os.makedirs(os.path.join(self.folder, 'empty'))
+        # -- a link to a folder, with a media file's name: neither yielded nor descended into
+        os.symlink(os.path.join(self.folder, '2019'), os.path.join(self.folder, 'linked.jpg'))
+        self.excludes = sources.source.FIX_EXCLUDE_PATHS
+        sources.source.FIX_EXCLUDE_PATHS = self.excludes | frozenset([os.path.join(self.folder, 'excluded')])
+
+    def tearDown(self):
+        sources.source.FIX_EXCLUDE_PATHS = self.excludes
+        shutil.rmtree(self.folder)
+
+    def _touch(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(path)
+
+    def _paths(self, source):
+        walked = list(source.paths())
+        files = [ (sf.original_path, sf.stats,) for sf in walked if not isinstance(sf, StitchFolder) ]
+        stitch_folders = [ sf.original_path for sf in walked if isinstance(sf, StitchFolder) ]
+        return (files, stitch_folders,)
+
+    def _assert_same_as_os_walk(self, **kwargs):
+        (files, stitch_folders,) = self._paths(Folder(mountpoint=self.folder, **kwargs))
+        (expected_files, expected_stitch_folders,) = _os_walk_paths(Folder(mountpoint=self.folder, **kwargs))
+        self.assertEqual([ f[0] for f in files ], [ f[0] for f in expected_files ])
+        self.assertEqual(stitch_folders, expected_stitch_folders)
+        # -- the stat carried on each SourceFile is the file's
+        for ((path, stats,), (expected_path, expected_stats,),) in zip(files, expected_files):
+            self.assertEqual((stats.st_ino, stats.st_size, stats.st_mtime_ns,), (expected_stats.st_ino, expected_stats.st_size, expected_stats.st_mtime_ns,))
+        return (files, stitch_folders,)
+
+    def test_same_as_os_walk(self):
+        (files, stitch_folders,) = self._assert_same_as_os_walk()
+        # -- listing order is the filesystem's, the same for both
+        self.assertEqual(sorted([ os.path.relpath(f[0], self.folder) for f in files ]), ['2019/album/c.jpg', '2019/album/d.cr2', '2019/album/deeper/e.png', 'a.jpg', 'b.MOV', 'z/h.mp4'])
+        self.assertEqual(sorted([ os.path.relpath(f, self.folder) for f in stitch_folders ]), ['2019/STITCH_0001', 'z/STITCH_0002'])
+
+    def test_same_as_os_walk_with_mask(self):
+        (files, stitch_folders,) = self._assert_same_as_os_walk(mask="^[a-c]\\.")
+        self.assertEqual(sorted([ os.path.relpath(f[0], self.folder) for f in files ]), ['2019/album/c.jpg', 'a.jpg', 'b.MOV'])
+
+    def test_processed_files_skipped(self):
+        source = Folder(mountpoint=self.folder)
+        source.processed_files.add(os.path.join(self.folder, '2019', 'album', 'c.jpg'))
+        (files, stitch_folders,) = self._paths(source)
+        self.assertNotIn(os.path.join(self.folder, '2019', 'album', 'c.jpg'), [ f[0] for f in files ])
+        self.assertEqual(len(files), 5)
+
+class TestIncrementalWalk(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.album = os.path.join(self.folder, '2019', 'album')
+        os.makedirs(self.album)
+        for name in ['a.jpg', 'b.mov', 'notes.txt']:
+            self._touch(os.path.join(self.album, name))
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def _touch(self, path):
+        with open(path, 'w') as f:
+            f.write(path)
+
+    def _walked(self, source):
+        return sorted([ entry.name for (folder, entry,) in source._walk(incremental=True) ])
+
+    def _rewalked(self, mask="*"):
+        '''
+        Files yielded by a walk using the manifest of a complete first walk
+        '''
+        first = Folder(mountpoint=self.folder)
+        self._walked(first)
+        source = Folder(mountpoint=self.folder, mask=mask)
+        source.manifest = first.completed_manifest()
+        return self._walked(source)
+
+    def test_unchanged_folder_not_listed(self):
+        self.assertEqual(self._walked(Folder(mountpoint=self.folder)), ['a.jpg', 'b.mov'])
+        self.assertEqual(self._rewalked(), [])
+
+    def test_new_file_listed(self):
+        first = Folder(mountpoint=self.folder)
+        self._walked(first)
+        album_stats = os.stat(self.album)
+        self._touch(os.path.join(self.album, 'c.jpg'))
+        # -- an entry added without the folder's mtime showing it
+        os.utime(self.album, ns=(album_stats.st_atime_ns, album_stats.st_mtime_ns))
+        source = Folder(mountpoint=self.folder)
+        source.manifest = first.completed_manifest()
+        self.assertEqual(self._walked(source), ['a.jpg', 'b.mov', 'c.jpg'])
+
+    def test_other_mask_listed(self):
+        self.assertEqual(self._rewalked(mask="^notes"), ['notes.txt'])
+
+    def test_full_rescan(self):
+        first = Folder(mountpoint=self.folder)
+        self._walked(first)
+        source = Folder(mountpoint=self.folder, full_rescan=True)
+        source.manifest = first.completed_manifest()
+        self.assertEqual(self._walked(source), ['a.jpg', 'b.mov'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+#!/usr/bin/python
+
+import os
+import shutil
+import tempfile
+import unittest
+from targetcache import TargetCache
+
+class TestTargetCache(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.day = os.path.join(self.folder, '2019', '2019-01-18')
+        os.makedirs(self.day)
+        with open(os.path.join(self.day, 'a.jpg'), 'w') as f:
+            f.write('a')
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_listing_read_once(self):
+        cache = TargetCache()
+        self.assertTrue(cache.exists(os.path.join(self.day, 'a.jpg')))
+        self.assertFalse(cache.exists(os.path.join(self.day, 'b.jpg')))
+        # -- changes made behind the cache's back aren't seen
+        with open(os.path.join(self.day, 'b.jpg'), 'w') as f:
+            f.write('b')
+        self.assertFalse(cache.exists(os.path.join(self.day, 'b.jpg')))
+
+    def test_add_and_remove(self):
+        cache = TargetCache()
+        path = os.path.join(self.day, 'b.jpg')
+        self.assertFalse(cache.exists(path))
+        cache.add(path)
+        self.assertTrue(cache.exists(path))
+        cache.remove(path)
+        self.assertFalse(cache.exists(path))
+
+    def test_missing_folder(self):
+        cache = TargetCache()
+        folder = os.path.join(self.folder, '2020', '2020-02-02')
+        path = os.path.join(folder, 'c.jpg')
+        self.assertFalse(cache.isdir(folder))
+        self.assertFalse(cache.exists(path))
+        # -- written along with its folder
+        cache.add(path)
+        self.assertTrue(cache.isdir(folder))
+        self.assertTrue(cache.exists(path))
+
+    def test_add_folder(self):
+        cache = TargetCache()
+        folder = os.path.join(self.folder, 'exact_matches')
+        self.assertFalse(cache.isdir(folder))
+        cache.add_folder(folder)
+        self.assertTrue(cache.isdir(folder))
+        self.assertFalse(cache.exists(os.path.join(folder, 'a.jpg')))
+
+if __name__ == '__main__':
+    unittest.main()
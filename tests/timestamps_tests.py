@@ -0,0 +1,59 @@
+#!/usr/bin/python
+
+import unittest
+from datetime import datetime
+from pytz import timezone
+import timestamps
+
+TZ = timezone('US/Eastern')
+
+class TestParsers(unittest.TestCase):
+
+    def test_parse_exif(self):
+        self.assertEqual(timestamps.parse_exif('2019:01:18 12:05:33'), datetime(2019, 1, 18, 12, 5, 33))
+        # -- a format some cameras write
+        self.assertEqual(timestamps.parse_exif('2019:01:18 12:05: 33'), datetime(2019, 1, 18, 12, 5, 33))
+
+    def test_parse_exif_invalid(self):
+        # -- cameras without a clock
+        self.assertIsNone(timestamps.parse_exif('0000:00:00 00:00:00'))
+        self.assertIsNone(timestamps.parse_exif('2019:13:18 12:05:33'))
+        self.assertIsNone(timestamps.parse_exif(''))
+
+    def test_parse_compact(self):
+        self.assertEqual(timestamps.parse_compact('20190118_120533'), datetime(2019, 1, 18, 12, 5, 33))
+        self.assertEqual(timestamps.parse_compact('20190118-120533'), datetime(2019, 1, 18, 12, 5, 33))
+        for value in ['20190118120533', '20191318_120533', '2019011_120533']:
+            with self.assertRaises(ValueError):
+                timestamps.parse_compact(value)
+
+    def test_parse_date(self):
+        self.assertEqual(timestamps.parse_date('2019_01_18'), datetime(2019, 1, 18))
+        self.assertEqual(timestamps.parse_date('2019-01-18'), datetime(2019, 1, 18))
+        with self.assertRaises(ValueError):
+            timestamps.parse_date('2019-1-18')
+
+    def test_keys(self):
+        d = datetime(2019, 1, 18, 12, 5, 33)
+        self.assertEqual(timestamps.day_key(d), (2019, 1, 18,))
+        self.assertEqual(timestamps.minute_key(d), (2019, 1, 18, 12, 5,))
+
+class TestLocalize(unittest.TestCase):
+
+    def test_same_as_pytz(self):
+        for naive in [datetime(2019, 1, 18, 12, 5, 33), datetime(2019, 7, 4, 23, 59, 59), datetime(2019, 7, 4, 0, 0, 0)]:
+            self.assertEqual(timestamps.localize(TZ, naive).utcoffset(), TZ.localize(naive).utcoffset())
+
+    def test_offset_cached_per_day(self):
+        timestamps.localize(TZ, datetime(2018, 5, 1, 8, 0, 0))
+        cached = timestamps._tzinfo_cache[(TZ, (2018, 5, 1,),)]
+        self.assertIs(timestamps.localize(TZ, datetime(2018, 5, 1, 20, 0, 0)).tzinfo, cached)
+
+    def test_dst_change_days(self):
+        for naive in [datetime(2019, 3, 10, 1, 30), datetime(2019, 3, 10, 3, 30), datetime(2019, 11, 3, 0, 30), datetime(2019, 11, 3, 12, 0)]:
+            self.assertEqual(timestamps.localize(TZ, naive), TZ.localize(naive))
+            self.assertEqual(timestamps.localize(TZ, naive).utcoffset(), TZ.localize(naive).utcoffset())
+        self.assertIsNone(timestamps._tzinfo_cache[(TZ, (2019, 3, 10,),)])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+#!/usr/bin/python
+
+import os
+import errno
+import shutil
+import hashlib
+import tempfile
+import unittest
+import transfer
+
+def _unavailable(src_fd, dest_fd, size, hasher=None):
+    raise OSError(errno.EOPNOTSUPP, "not here")
+
+def _short(src_fd, dest_fd, size, hasher=None):
+    # -- a card read that stops early, 10 bytes in
+    os.write(dest_fd, os.pread(src_fd, 10, 0))
+    return 10
+
+def _broken(src_fd, dest_fd, size, hasher=None):
+    os.write(dest_fd, os.pread(src_fd, 10, 0))
+    raise OSError(errno.EIO, "input/output error")
+
+class TestTransfer(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.src = os.path.join(self.folder, 'src.jpg')
+        self.dest = os.path.join(self.folder, 'dest.jpg')
+        self.content = os.urandom(3*transfer.COPY_CHUNK_SIZE + 17)
+        with open(self.src, 'wb') as f:
+            f.write(self.content)
+        os.utime(self.src, (1500000000, 1500000000))
+        self.methods = transfer.COPY_METHODS
+
+    def tearDown(self):
+        transfer.COPY_METHODS = self.methods
+        shutil.rmtree(self.folder)
+
+    def _dest_content(self):
+        with open(self.dest, 'rb') as f:
+            return f.read()
+
+    def test_copy_keeps_content_and_times(self):
+        result = transfer.copy_file(self.src, self.dest)
+        self.assertEqual(self._dest_content(), self.content)
+        self.assertEqual(result['bytes'], len(self.content))
+        self.assertEqual(os.stat(self.dest).st_mtime, 1500000000)
+        self.assertNotIn('digest', result)
+
+    def test_falls_back_and_hashes_buffered_copy(self):
+        transfer.COPY_METHODS = [('reflink', _unavailable), ('buffered', transfer._buffered)]
+        result = transfer.copy_file(self.src, self.dest, digest='md5')
+        self.assertEqual(result['method'], 'buffered')
+        self.assertEqual(result['digest'], hashlib.md5(self.content).hexdigest())
+        self.assertEqual(self._dest_content(), self.content)
+
+    def test_zero_copy_hashes_in_the_same_pass(self):
+        methods = [('sendfile', transfer._sendfile)]
+        if hasattr(os, 'copy_file_range'):
+            methods.append(('copy_file_range', transfer._copy_file_range))
+        for method in methods:
+            transfer.COPY_METHODS = [method]
+            result = transfer.copy_file(self.src, self.dest, digest='md5')
+            self.assertEqual(result['method'], method[0])
+            self.assertEqual(result['digest'], hashlib.md5(self.content).hexdigest())
+            self.assertEqual(self._dest_content(), self.content)
+            os.unlink(self.dest)
+
+    def test_zero_copy_carries_known_digest(self):
+        transfer.COPY_METHODS = [('sendfile', transfer._sendfile), ('buffered', transfer._buffered)]
+        result = transfer.copy_file(self.src, self.dest, digest='md5', source_digest='known')
+        self.assertEqual(result['method'], 'sendfile')
+        self.assertEqual(result['digest'], 'known')
+
+    def test_verify_reads_only_dest(self):
+        transfer.COPY_METHODS = [('sendfile', transfer._sendfile)]
+        read = []
+        file_digest = transfer.file_digest
+        def recording_digest(path, digest):
+            read.append(path)
+            return file_digest(path, digest)
+        transfer.file_digest = recording_digest
+        try:
+            result = transfer.copy_file(self.src, self.dest, verify=True)
+        finally:
+            transfer.file_digest = file_digest
+        self.assertEqual(read, [self.dest])
+        self.assertEqual(result['digest'], hashlib.md5(self.content).hexdigest())
+
+    def test_verify(self):
+        transfer.copy_file(self.src, self.dest, digest='md5', verify=True)
+        with self.assertRaises(IOError):
+            transfer.copy_file(self.src, self.dest, digest='md5', verify=True, source_digest='0'*32)
+        self.assertFalse(os.path.exists(self.dest))
+
+    def test_short_copy(self):
+        transfer.COPY_METHODS = [('short', _short)]
+        with self.assertRaises(IOError):
+            transfer.copy_file(self.src, self.dest)
+        self.assertFalse(os.path.exists(self.dest))
+
+    def test_failed_copy_removes_dest(self):
+        transfer.COPY_METHODS = [('broken', _broken)]
+        with self.assertRaises(OSError):
+            transfer.copy_file(self.src, self.dest)
+        self.assertFalse(os.path.exists(self.dest))
+
+    def test_move_across_filesystems_keeps_source_of_short_copy(self):
+        transfer.COPY_METHODS = [('short', _short)]
+        rename = os.rename
+        def cross_device(src, dest):
+            raise OSError(errno.EXDEV, "cross-device link")
+        os.rename = cross_device
+        try:
+            with self.assertRaises(IOError):
+                transfer.move_file(self.src, self.dest)
+        finally:
+            os.rename = rename
+        self.assertFalse(os.path.exists(self.dest))
+        self.assertTrue(os.path.exists(self.src))
+
+    def test_move_renames(self):
+        result = transfer.move_file(self.src, self.dest, source_digest='known')
+        self.assertEqual(result['method'], 'rename')
+        self.assertEqual(result['digest'], 'known')
+        self.assertFalse(os.path.exists(self.src))
+        self.assertEqual(self._dest_content(), self.content)
+
+if __name__ == '__main__':
+    unittest.main()
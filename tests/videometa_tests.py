@@ -0,0 +1,80 @@
+#!/usr/bin/python
+
+import os
+import struct
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timezone
+import videometa
+from videometa import read_video_tags, CREATION_TAG
+
+# -- 2019-01-18 12:05:33 UTC
+CREATION = datetime(2019, 1, 18, 12, 5, 33, tzinfo=timezone.utc)
+CREATION_SECONDS = int((CREATION - videometa.QUICKTIME_EPOCH).total_seconds())
+
+def _atom(kind, body):
+    return struct.pack('>I4s', 8 + len(body), kind) + body
+
+def _ftyp(brand):
+    return _atom(b'ftyp', brand + b'\x00\x00\x00\x00' + brand)
+
+def _mvhd_v0(seconds):
+    return _atom(b'mvhd', b'\x00\x00\x00\x00' + struct.pack('>II', seconds, seconds) + bytes(88))
+
+def _mvhd_v1(seconds):
+    return _atom(b'mvhd', b'\x01\x00\x00\x00' + struct.pack('>QQ', seconds, seconds) + bytes(96))
+
+def _chunk(chunk_id, data):
+    return struct.pack('<4sI', chunk_id, len(data)) + data + (b'\x00' if len(data) % 2 else b'')
+
+def _avi(idit):
+    hdrl = _chunk(b'LIST', b'hdrl' + _chunk(b'avih', bytes(56)) + _chunk(b'IDIT', idit))
+    movi = _chunk(b'LIST', b'movi' + _chunk(b'00dc', bytes(100)))
+    body = b'AVI ' + hdrl + movi
+    return b'RIFF' + struct.pack('<I', len(body)) + body
+
+class TestVideoMeta(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def _tags(self, content):
+        path = os.path.join(self.folder, 'video')
+        with open(path, 'wb') as f:
+            f.write(content)
+        return read_video_tags(path)
+
+    def test_mp4_mvhd(self):
+        tags = self._tags(_ftyp(b'isom') + _atom(b'mdat', bytes(1000)) + _atom(b'moov', _mvhd_v0(CREATION_SECONDS)))
+        self.assertEqual(tags, { CREATION_TAG: CREATION })
+
+    def test_mov_mvhd_version_1(self):
+        tags = self._tags(_atom(b'wide', b'') + _atom(b'moov', _mvhd_v1(CREATION_SECONDS)))
+        self.assertEqual(tags, { CREATION_TAG: CREATION })
+
+    def test_creation_not_set(self):
+        self.assertEqual(self._tags(_ftyp(b'qt  ') + _atom(b'moov', _mvhd_v0(0))), {})
+
+    def test_no_movie_header_left_to_exifread(self):
+        self.assertIsNone(self._tags(_ftyp(b'isom') + _atom(b'mdat', bytes(100))))
+
+    def test_heif_and_cr3_left_to_exifread(self):
+        for brand in [b'heic', b'mif1', b'avif', b'crx ']:
+            self.assertIsNone(self._tags(_ftyp(brand) + _atom(b'meta', bytes(100)) + _atom(b'moov', _mvhd_v0(CREATION_SECONDS))))
+
+    def test_avi_idit(self):
+        tags = self._tags(_avi(b'Fri Jan 18 12:05:33 2019\n\x00'))
+        self.assertEqual(tags, { CREATION_TAG: datetime(2019, 1, 18, 12, 5, 33) })
+
+    def test_avi_without_idit(self):
+        self.assertEqual(self._tags(b'RIFF' + struct.pack('<I', 4 + 108) + b'AVI ' + _chunk(b'LIST', b'movi' + _chunk(b'00dc', bytes(100)))), {})
+
+    def test_not_a_video(self):
+        self.assertIsNone(self._tags(b'\xff\xd8\xff\xe0' + bytes(100)))
+
+if __name__ == '__main__':
+    unittest.main()